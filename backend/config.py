@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 
 
 def get_int(name: str, default: int | None = None) -> int | None:
@@ -16,3 +17,14 @@ def get_bool(name: str, default: bool = False) -> bool:
     if raw is None or raw == "":
         return default
     return raw.strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+def state_dir() -> Path:
+    # Job state (caches, validators). systemd exports STATE_DIRECTORY for units with
+    # StateDirectory=, already owned by the unit's User=; manual runs fall back to a
+    # per-user directory rather than the root-provisioned /var/lib/libyaintel.
+    raw = os.getenv("LIBYAINTEL_STATE_DIR") or (os.getenv("STATE_DIRECTORY") or "").split(":")[0]
+    if raw:
+        return Path(raw)
+    base = os.getenv("XDG_STATE_HOME") or str(Path.home() / ".local" / "state")
+    return Path(base) / "libyaintel"
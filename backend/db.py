@@ -14,6 +14,9 @@ load_dotenv(_ENV_PATH)
 
 _source_cache: dict[str, str] = {}
 _key_column: str | None = None
+_entities_rpc_ok: bool | None = None
+_gdelt_merge_rpc_ok: bool | None = None
+_entity_tables_ok: bool | None = None
 _sb = None
 
 
@@ -63,57 +66,86 @@ def get_article_id_by_url(sb, url: str | None) -> int | None:
     return None
 
 
-def upsert_entities_for_article(sb, article_id: int | None, ents: dict | None) -> None:
-    if not article_id or not ents:
-        return
-    if not _table_exists(sb, "entities") or not _table_exists(sb, "article_entities"):
-        return
+_ENTITY_TYPE_MAP = {
+    "orgs": "org",
+    "people": "person",
+    "locations": "location",
+    "topics": "topic",
+}
 
-    type_map = {
-        "orgs": "org",
-        "people": "person",
-        "locations": "location",
-        "topics": "topic",
-    }
+
+def _build_entity_rows(ents: dict | None) -> list[dict]:
     rows: list[dict] = []
-    normals: list[str] = []
-    for key, entity_type in type_map.items():
+    if not ents:
+        return rows
+    for key, entity_type in _ENTITY_TYPE_MAP.items():
         for name in (ents.get(key) or []):
             norm = _normalize_entity(str(name))
             if not norm:
                 continue
             rows.append({"name": str(name), "type": entity_type, "normalized_name": norm})
-            normals.append(norm)
-
-    if not rows:
+    return rows
+
+
+def _entity_tables_exist(sb) -> bool:
+    # Only a positive answer is cached; get_columns failures are retried next call.
+    global _entity_tables_ok
+    if not _entity_tables_ok:
+        _entity_tables_ok = _table_exists(sb, "entities") and _table_exists(sb, "article_entities")
+    return _entity_tables_ok
+
+
+def upsert_entities_for_articles(sb, items: list[tuple[int | None, dict | None]]) -> None:
+    # items: (article_id, entities payload) pairs; one entities upsert and one
+    # article_entities upsert for the whole batch instead of one round per article.
+    per_article: list[tuple[int, list[dict]]] = []
+    for article_id, ents in items:
+        rows = _build_entity_rows(ents)
+        if article_id and rows:
+            per_article.append((article_id, rows))
+    if not per_article or not _entity_tables_exist(sb):
         return
 
+    entity_rows = [row for _, rows in per_article for row in rows]
+    ids_by_norm: dict[str, int] = {}
     try:
-        sb.table("entities").upsert(rows, on_conflict="normalized_name").execute()
+        for row in upsert_rows(sb, "entities", entity_rows, "normalized_name"):
+            if row.get("id") and row.get("normalized_name"):
+                ids_by_norm[row["normalized_name"]] = row["id"]
     except Exception:
         return
 
+    missing = list({row["normalized_name"] for row in entity_rows} - ids_by_norm.keys())
+    for i in range(0, len(missing), 500):
+        try:
+            res = (
+                sb.table("entities")
+                .select("id,normalized_name")
+                .in_("normalized_name", missing[i : i + 500])
+                .execute()
+            )
+        except Exception:
+            return
+        for row in res.data or []:
+            if row.get("id"):
+                ids_by_norm[row.get("normalized_name")] = row["id"]
+
+    link_rows = [
+        {"article_id": article_id, "entity_id": ids_by_norm[row["normalized_name"]]}
+        for article_id, rows in per_article
+        for row in rows
+        if row["normalized_name"] in ids_by_norm
+    ]
+    if not link_rows:
+        return
     try:
-        res = (
-            sb.table("entities")
-            .select("id,normalized_name")
-            .in_("normalized_name", list(set(normals)))
-            .execute()
-        )
+        upsert_rows(sb, "article_entities", link_rows, "article_id,entity_id")
     except Exception:
         return
 
-    ids = [row.get("id") for row in (res.data or []) if row.get("id")]
-    if not ids:
-        return
 
-    link_rows = [{"article_id": article_id, "entity_id": eid} for eid in ids]
-    try:
-        sb.table("article_entities").upsert(
-            link_rows, on_conflict="article_id,entity_id"
-        ).execute()
-    except Exception:
-        return
+def upsert_entities_for_article(sb, article_id: int | None, ents: dict | None) -> None:
+    upsert_entities_for_articles(sb, [(article_id, ents)])
 
 
 def content_hash(payload: dict) -> str:
@@ -121,8 +153,8 @@ def content_hash(payload: dict) -> str:
     return hashlib.sha256(stable).hexdigest()
 
 
-def upsert_feed_item(sb, item: dict) -> str | None:
-    # item: must include source_type, external_id OR hash, published_at
+def prepare_feed_item(item: dict) -> dict:
+    # Fills the content hash and published_at in place; a no-op once hash is set.
     if not item.get("hash"):
         item["hash"] = content_hash(
             {
@@ -136,25 +168,152 @@ def upsert_feed_item(sb, item: dict) -> str | None:
 
     if not item.get("published_at"):
         item["published_at"] = datetime.utcnow().isoformat()
+    return item
+
+
+def upsert_rows(
+    sb, table: str, rows: list[dict], on_conflict: str, chunk_size: int = 500
+) -> list[dict]:
+    # PostgREST bulk upserts need every object in one payload to share the same
+    # keys, and Postgres rejects a batch that touches the same conflict row twice.
+    deduped: dict = {}
+    for row in rows:
+        key = tuple(row.get(col) for col in on_conflict.split(","))
+        deduped[key] = row
+    groups: dict[tuple, list[dict]] = {}
+    for row in deduped.values():
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    out: list[dict] = []
+    for group in groups.values():
+        for i in range(0, len(group), chunk_size):
+            res = sb.table(table).upsert(group[i : i + chunk_size], on_conflict=on_conflict).execute()
+            out.extend(res.data or [])
+    return out
+
+
+def upsert_feed_items(sb, items: list[dict]) -> None:
+    items = [prepare_feed_item(item) for item in items]
+    by_external = [item for item in items if item.get("external_id")]
+    by_hash = [item for item in items if not item.get("external_id")]
+    if by_external:
+        upsert_rows(sb, "feed_items", by_external, "external_id")
+    if by_hash:
+        upsert_rows(sb, "feed_items", by_hash, "hash")
 
+
+def upsert_feed_item(sb, item: dict) -> str | None:
+    # item: must include source_type, external_id OR hash, published_at
+    prepare_feed_item(item)
+
+    # The upsert returns the written row, so no follow-up select is needed for the id.
     if item.get("external_id"):
-        sb.table("feed_items").upsert(item, on_conflict="external_id").execute()
-        lookup_col = "external_id"
-        lookup_val = item.get("external_id")
+        res = sb.table("feed_items").upsert(item, on_conflict="external_id").execute()
     else:
-        sb.table("feed_items").upsert(item, on_conflict="hash").execute()
-        lookup_col = "hash"
-        lookup_val = item.get("hash")
-
-    if lookup_val is None:
-        return None
+        res = sb.table("feed_items").upsert(item, on_conflict="hash").execute()
 
-    res = sb.table("feed_items").select("id").eq(lookup_col, lookup_val).limit(1).execute()
     if res.data:
-        return res.data[0]["id"]
+        return res.data[0].get("id")
     return None
 
 
+def update_feed_item_entities(sb, updates: list[dict]) -> None:
+    # updates: [{"external_id" | "hash": ..., "entities": {...}}]
+    global _entities_rpc_ok
+    if not updates:
+        return
+    if _entities_rpc_ok is not False:
+        rows = [
+            {
+                "external_id": u.get("external_id"),
+                "hash": None if u.get("external_id") else u.get("hash"),
+                "entities": u.get("entities"),
+            }
+            for u in updates
+        ]
+        try:
+            sb.rpc("set_feed_item_entities", {"p_rows": rows}).execute()
+            _entities_rpc_ok = True
+            return
+        except Exception:
+            if _entities_rpc_ok is None:
+                _entities_rpc_ok = False
+            else:
+                raise
+    for u in updates:
+        if u.get("external_id"):
+            sb.table("feed_items").update({"entities": u.get("entities")}).eq(
+                "external_id", u["external_id"]
+            ).execute()
+        else:
+            sb.table("feed_items").update({"entities": u.get("entities")}).eq(
+                "hash", u["hash"]
+            ).execute()
+
+
+def get_existing_external_ids(sb, external_ids: list[str], chunk_size: int = 100) -> set[str]:
+    # The subset of external_ids already in feed_items; one select per chunk.
+    out: set[str] = set()
+    ids = list(dict.fromkeys(i for i in external_ids if i))
+    for i in range(0, len(ids), chunk_size):
+        res = (
+            sb.table("feed_items")
+            .select("external_id")
+            .in_("external_id", ids[i : i + chunk_size])
+            .execute()
+        )
+        out.update(row["external_id"] for row in res.data or [])
+    return out
+
+
+def _merge_gdelt_raw(raw, merge: dict) -> dict:
+    # Client-side twin of merge_gdelt_topics / jsonb_array_union: stored entries are
+    # kept as-is (duplicates too), new entries are appended once each, in order.
+    raw = raw if isinstance(raw, dict) else {}
+    gdelt = raw.get("gdelt")
+    gdelt = gdelt if isinstance(gdelt, dict) else {}
+    for field in ("topics_found", "tags", "raw_urls"):
+        cur = gdelt.get(field)
+        cur = cur if isinstance(cur, list) else []
+        new = merge.get(field)
+        for v in new if isinstance(new, list) else []:
+            if v not in cur:
+                cur.append(v)
+        gdelt[field] = cur
+    raw["gdelt"] = gdelt
+    return raw
+
+
+def merge_gdelt_topics(sb, rows: list[dict]) -> None:
+    # rows: [{"external_id", "topics_found", "tags", "raw_urls"}], one per external_id
+    global _gdelt_merge_rpc_ok
+    if not rows:
+        return
+    if _gdelt_merge_rpc_ok is not False:
+        try:
+            sb.rpc("merge_gdelt_topics", {"p_rows": rows}).execute()
+            _gdelt_merge_rpc_ok = True
+            return
+        except Exception:
+            if _gdelt_merge_rpc_ok is None:
+                _gdelt_merge_rpc_ok = False
+            else:
+                raise
+    for row in rows:
+        res = (
+            sb.table("feed_items")
+            .select("raw")
+            .eq("external_id", row["external_id"])
+            .limit(1)
+            .execute()
+        )
+        if not res.data:
+            continue
+        raw = _merge_gdelt_raw(res.data[0].get("raw"), row)
+        sb.table("feed_items").update({"raw": raw}).eq(
+            "external_id", row["external_id"]
+        ).execute()
+
+
 def enqueue_fetch(sb, source_id: str | None, url: str | None, reason: str) -> None:
     if not source_id or not url:
         return
@@ -291,6 +450,20 @@ def is_source_in_cooldown(sb, source_key: str) -> bool:
         return False
 
 
+def get_cooldown_set(sb) -> set[str]:
+    # Every source currently in cooldown, in one query for a whole run.
+    try:
+        res = (
+            sb.table("source_health")
+            .select("source_key")
+            .gt("cooldown_until", datetime.now(timezone.utc).isoformat())
+            .execute()
+        )
+    except Exception:
+        return set()
+    return {row["source_key"] for row in (res.data or []) if row.get("source_key")}
+
+
 def mark_source_blocked(sb, source_key: str, cooldown_hours: int = 24) -> None:
     try:
         now = datetime.now(timezone.utc)
@@ -1,5 +1,7 @@
+import hashlib
 import json
 import os
+import threading
 import re
 
 import requests
@@ -11,7 +13,32 @@ load_dotenv()
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
 OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", "120"))
+# Keeps the model resident between entries; Ollama's default unloads it after 5 minutes.
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "60m")
 OLLAMA_DISABLE = os.getenv("OLLAMA_DISABLE", "").strip().lower() in {"1", "true", "yes"}
+ENTITY_CACHE_DISABLE = os.getenv("ENTITY_CACHE_DISABLE", "").strip().lower() in {"1", "true", "yes"}
+ENTITY_MEMO_MAX = int(os.getenv("ENTITY_MEMO_MAX", "5000"))
+
+_entity_memo: dict[str, dict] = {}
+_entity_memo_lock = threading.Lock()
+_entity_cache_hits = {"memo": 0, "db": 0, "miss": 0}
+
+
+def _memo_put(key: str, ents: dict) -> None:
+    # Caller holds _entity_memo_lock. Dicts keep insertion order, so drop the oldest.
+    _entity_memo[key] = ents
+    while len(_entity_memo) > max(1, ENTITY_MEMO_MAX):
+        _entity_memo.pop(next(iter(_entity_memo)))
+
+
+def log_entity_cache_stats() -> None:
+    with _entity_memo_lock:
+        hits = dict(_entity_cache_hits)
+    if any(hits.values()):
+        print(
+            f"ENTITY_CACHE memo_hits={hits['memo']} db_hits={hits['db']} "
+            f"misses={hits['miss']}"
+        )
 
 
 def _empty_entities() -> dict:
@@ -49,6 +76,99 @@ def _extract_json(text: str) -> dict:
     return json.loads(m.group(0))
 
 
+def warm_ollama(timeout: tuple[int, int] = (2, 120)) -> bool:
+    # An empty prompt loads the model without generating, so the first entity
+    # call of a run does not pay the load time.
+    if OLLAMA_DISABLE:
+        return False
+    try:
+        r = requests.post(
+            f"{OLLAMA_HOST}/api/generate",
+            json={"model": OLLAMA_MODEL, "prompt": "", "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=timeout,
+        )
+        return r.status_code == 200
+    except Exception:
+        return False
+
+
+def start_ollama_warmup() -> None:
+    # Loads the model on a daemon thread while the run starts crawling.
+    threading.Thread(target=warm_ollama, name="ollama-warmup", daemon=True).start()
+
+
+def _entity_inputs(
+    title: str | None, summary: str | None, content: str | None
+) -> tuple[str, str]:
+    # (title, text) exactly as they go into the prompt.
+    title = _clean_text(title or "")
+    summary = _clean_text(summary or "")
+    content = _clean_text(content or "")
+
+    max_chars = int(os.getenv("ENTITY_TEXT_MAX_CHARS", "4000"))
+    text = (content or summary or "")
+    return title, text[:max_chars]
+
+
+def entity_cache_key(
+    title: str | None,
+    summary: str | None,
+    content: str | None,
+    lang: str | None = None,
+) -> str:
+    title, text = _entity_inputs(title, summary, content)
+    raw = "\0".join([OLLAMA_MODEL, lang or "unknown", title, text])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def extract_entities_cached(
+    sb,
+    title: str | None,
+    summary: str | None,
+    content: str | None,
+    lang: str | None = None,
+) -> dict:
+    """
+    extract_entities behind the entity_cache table (and an in-process memo), keyed
+    on the model plus the prompt inputs. Empty results are not cached since they
+    are also what extract_entities returns when Ollama is unreachable.
+    """
+    if ENTITY_CACHE_DISABLE or OLLAMA_DISABLE:
+        return extract_entities(title=title, summary=summary, content=content, lang=lang)
+
+    key = entity_cache_key(title, summary, content, lang)
+    with _entity_memo_lock:
+        hit = _entity_memo.get(key)
+        if hit is not None:
+            _entity_cache_hits["memo"] += 1
+    if hit is not None:
+        return hit
+    try:
+        res = sb.table("entity_cache").select("entities").eq("key", key).limit(1).execute()
+        if res.data and isinstance(res.data[0].get("entities"), dict):
+            ents = res.data[0]["entities"]
+            with _entity_memo_lock:
+                _memo_put(key, ents)
+                _entity_cache_hits["db"] += 1
+            return ents
+    except Exception:
+        pass
+
+    with _entity_memo_lock:
+        _entity_cache_hits["miss"] += 1
+    ents = extract_entities(title=title, summary=summary, content=content, lang=lang)
+    if any(ents.get(k) for k in ("orgs", "people", "locations", "topics")):
+        with _entity_memo_lock:
+            _memo_put(key, ents)
+        try:
+            sb.table("entity_cache").upsert(
+                {"key": key, "entities": ents}, on_conflict="key"
+            ).execute()
+        except Exception:
+            pass
+    return ents
+
+
 def extract_entities(
     title: str | None,
     summary: str | None,
@@ -63,13 +183,7 @@ def extract_entities(
         print("ENTITY_SKIP reason=ollama_disabled")
         return _empty_entities()
 
-    title = _clean_text(title or "")
-    summary = _clean_text(summary or "")
-    content = _clean_text(content or "")
-
-    max_chars = int(os.getenv("ENTITY_TEXT_MAX_CHARS", "4000"))
-    text = (content or summary or "")
-    text = text[:max_chars]
+    title, text = _entity_inputs(title, summary, content)
 
     prompt = f"""
 You are extracting entities from a Libya-related news item.
@@ -101,6 +215,7 @@ Text: {text}
         "prompt": prompt,
         "stream": False,
         "format": "json",
+        "keep_alive": OLLAMA_KEEP_ALIVE,
     }
 
     for attempt in range(2):
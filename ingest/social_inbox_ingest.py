@@ -16,7 +16,12 @@ from backend.db import (
     get_client,
     upsert_feed_item,
 )
-from backend.ollama import extract_entities, is_ollama_healthy
+from backend.ollama import (
+    extract_entities_cached,
+    is_ollama_healthy,
+    log_entity_cache_stats,
+    start_ollama_warmup,
+)
 from backend.config import get_bool, get_int
 
 load_dotenv()
@@ -134,6 +139,8 @@ def main() -> int:
             ollama_ok = False
             stats["llm_unavailable"] += 1
             stats["warnings"] = ["ollama_unreachable"]
+        else:
+            start_ollama_warmup()
         stats["llm_available"] = ollama_ok
 
     try:
@@ -235,7 +242,8 @@ def main() -> int:
                 upsert_feed_item(sb, feed_item)
                 if ollama_ok and should_extract_entities(feed_item):
                     try:
-                        ents = extract_entities(
+                        ents = extract_entities_cached(
+                            sb,
                             title=feed_item.get("title"),
                             summary=feed_item.get("summary"),
                             content=feed_item.get("content"),
@@ -288,6 +296,7 @@ def main() -> int:
         raise
     finally:
         print(f"Done. Inserted={inserted} Skipped={skipped}")
+        log_entity_cache_stats()
         if aborted:
             stats["aborted"] = True
         ok = (
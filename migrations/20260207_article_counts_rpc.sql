@@ -0,0 +1,19 @@
+CREATE OR REPLACE FUNCTION public.article_counts_by_column(
+  p_source_col text,
+  p_ts_col text,
+  p_since timestamptz
+)
+RETURNS TABLE(raw_key text, n bigint) AS $$
+BEGIN
+  IF p_source_col NOT IN ('source_key', 'source_id', 'source')
+     OR p_ts_col NOT IN ('published_at', 'created_at') THEN
+    RAISE EXCEPTION 'unsupported column: %, %', p_source_col, p_ts_col;
+  END IF;
+  RETURN QUERY EXECUTE format(
+    'SELECT %1$I::text, count(*) FROM public.articles '
+    'WHERE %2$I >= $1 AND %1$I IS NOT NULL GROUP BY 1',
+    p_source_col,
+    p_ts_col
+  ) USING p_since;
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS entity_cache (
+  key text PRIMARY KEY,
+  entities jsonb NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_entity_cache_created_at
+  ON entity_cache(created_at);
+
+CREATE OR REPLACE FUNCTION public.prune_entity_cache(p_max_age interval DEFAULT interval '30 days')
+RETURNS integer AS $$
+DECLARE
+  n integer;
+BEGIN
+  DELETE FROM public.entity_cache WHERE created_at < now() - p_max_age;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,23 @@
+CREATE OR REPLACE FUNCTION public.set_feed_item_entities(p_rows jsonb)
+RETURNS integer AS $$
+DECLARE
+  n_ext integer;
+  n_hash integer;
+BEGIN
+  UPDATE public.feed_items f
+  SET entities = r.entities
+  FROM jsonb_to_recordset(p_rows) AS r(external_id text, hash text, entities jsonb)
+  WHERE r.external_id IS NOT NULL
+    AND f.external_id = r.external_id;
+  GET DIAGNOSTICS n_ext = ROW_COUNT;
+
+  UPDATE public.feed_items f
+  SET entities = r.entities
+  FROM jsonb_to_recordset(p_rows) AS r(external_id text, hash text, entities jsonb)
+  WHERE r.external_id IS NULL
+    AND f.hash = r.hash;
+  GET DIAGNOSTICS n_hash = ROW_COUNT;
+
+  RETURN n_ext + n_hash;
+END;
+$$ LANGUAGE plpgsql;
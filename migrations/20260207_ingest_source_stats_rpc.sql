@@ -0,0 +1,17 @@
+CREATE OR REPLACE FUNCTION public.ingest_source_stats(
+  p_job_name text,
+  p_start timestamptz,
+  p_end timestamptz
+)
+RETURNS TABLE(started_at timestamptz, source_key text, stats jsonb) AS $$
+  SELECT r.started_at, s.key, s.value
+  FROM public.ingest_runs r
+  CROSS JOIN LATERAL jsonb_each(
+    CASE WHEN jsonb_typeof(r.stats->'by_source') = 'object'
+      THEN r.stats->'by_source' ELSE '{}'::jsonb END
+  ) AS s
+  WHERE r.job_name = p_job_name
+    AND r.started_at >= p_start
+    AND r.started_at < p_end
+    AND jsonb_typeof(s.value) = 'object';
+$$ LANGUAGE sql STABLE;
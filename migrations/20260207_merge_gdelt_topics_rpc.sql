@@ -0,0 +1,53 @@
+-- Keeps every element of a as stored (duplicates included, in order), then appends
+-- the distinct elements of b that are not already in a, in b's order. Non-array
+-- inputs are treated as empty. backend/db.py:_merge_gdelt_raw must match this.
+CREATE OR REPLACE FUNCTION public.jsonb_array_union(a jsonb, b jsonb)
+RETURNS jsonb AS $$
+  WITH
+    aa AS (
+      SELECT v, ord
+      FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(a) = 'array' THEN a ELSE '[]'::jsonb END
+      ) WITH ORDINALITY AS t(v, ord)
+    ),
+    bb AS (
+      SELECT DISTINCT ON (t.v) t.v, t.ord
+      FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(b) = 'array' THEN b ELSE '[]'::jsonb END
+      ) WITH ORDINALITY AS t(v, ord)
+      WHERE NOT EXISTS (SELECT 1 FROM aa WHERE aa.v = t.v)
+      ORDER BY t.v, t.ord
+    )
+  SELECT coalesce(jsonb_agg(v ORDER BY part, ord), '[]'::jsonb)
+  FROM (
+    SELECT 0 AS part, v, ord FROM aa
+    UNION ALL
+    SELECT 1 AS part, v, ord FROM bb
+  ) u;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- p_rows: [{"external_id", "topics_found": [...], "tags": [...], "raw_urls": [...]}],
+-- at most one row per external_id.
+CREATE OR REPLACE FUNCTION public.merge_gdelt_topics(p_rows jsonb)
+RETURNS integer AS $$
+DECLARE
+  n integer;
+BEGIN
+  UPDATE public.feed_items f
+  SET raw = jsonb_set(
+    CASE WHEN jsonb_typeof(f.raw) = 'object' THEN f.raw ELSE '{}'::jsonb END,
+    '{gdelt}',
+    CASE WHEN jsonb_typeof(f.raw->'gdelt') = 'object' THEN f.raw->'gdelt' ELSE '{}'::jsonb END
+      || jsonb_build_object(
+        'topics_found', public.jsonb_array_union(f.raw->'gdelt'->'topics_found', r.topics_found),
+        'tags', public.jsonb_array_union(f.raw->'gdelt'->'tags', r.tags),
+        'raw_urls', public.jsonb_array_union(f.raw->'gdelt'->'raw_urls', r.raw_urls)
+      )
+  )
+  FROM jsonb_to_recordset(p_rows)
+    AS r(external_id text, topics_found jsonb, tags jsonb, raw_urls jsonb)
+  WHERE f.external_id = r.external_id;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,22 @@
+CREATE OR REPLACE FUNCTION public.summary_status_counts(
+  p_source_col text,
+  p_start timestamptz DEFAULT NULL,
+  p_end timestamptz DEFAULT NULL
+)
+RETURNS TABLE(raw_key text, status text, n bigint) AS $$
+BEGIN
+  IF p_source_col NOT IN ('source_id', 'source') THEN
+    RAISE EXCEPTION 'unsupported column: %', p_source_col;
+  END IF;
+  RETURN QUERY EXECUTE format(
+    'SELECT %1$I::text, '
+    'CASE WHEN summary_status = ''DONE_FASTPATH'' THEN ''DONE'' '
+    'ELSE COALESCE(NULLIF(summary_status, ''''), ''UNKNOWN'') END, '
+    'count(*) FROM public.articles '
+    'WHERE ($1 IS NULL OR summary_updated_at >= $1) '
+    'AND ($2 IS NULL OR summary_updated_at < $2) '
+    'GROUP BY 1, 2',
+    p_source_col
+  ) USING p_start, p_end;
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS tender_attachments_cache (
+  url text PRIMARY KEY,
+  etag text,
+  last_modified text,
+  content_hash text,
+  extracted_text text,
+  fetched_at timestamptz NOT NULL DEFAULT now()
+);
@@ -3,13 +3,14 @@ import os
 import re
 import time
 import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import urlparse
-from typing import Optional
+from typing import Any, Callable, Iterable, Optional
 
 import requests
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound
 
 
 HEADERS = {
@@ -140,10 +141,20 @@ def _is_dns_error(err: Exception) -> bool:
     return "temporary failure in name resolution" in msg or "errno -3" in msg
 
 
-def fetch_url(url: str, headers: dict) -> tuple[Optional[str], Optional[str]]:
+def fetch_url(
+    url: str, headers: dict, validators: Optional[dict] = None
+) -> tuple[Optional[str], Optional[str]]:
+    # With `validators` ({"etag", "modified"} from an earlier fetch) the request is
+    # conditional: a 304 returns (None, "not_modified") and a 200 refreshes the dict.
     try:
         session = _get_session()
         merged_headers = _rotate_headers(url, headers)
+        if validators:
+            merged_headers = dict(merged_headers)
+            if validators.get("etag"):
+                merged_headers["If-None-Match"] = validators["etag"]
+            if validators.get("modified"):
+                merged_headers["If-Modified-Since"] = validators["modified"]
         last_response = None
         last_exception = None
         for attempt, delay in enumerate(RETRY_BACKOFFS):
@@ -207,7 +218,14 @@ def fetch_url(url: str, headers: dict) -> tuple[Optional[str], Optional[str]]:
                     continue
             if response.status_code in (401, 403, 429):
                 return None, f"blocked:{response.status_code}"
+            if response.status_code == 304 and validators:
+                if FETCH_LOG:
+                    print(f"GET {url} status=304 elapsed={elapsed_ms}ms")
+                return None, "not_modified"
             response.raise_for_status()
+            if validators is not None:
+                validators["etag"] = response.headers.get("etag")
+                validators["modified"] = response.headers.get("last-modified")
             if FETCH_LOG:
                 print(
                     f"GET {url} status={response.status_code} "
@@ -229,9 +247,88 @@ def fetch_url(url: str, headers: dict) -> tuple[Optional[str], Optional[str]]:
         return None, f"request_error:{type(e).__name__}"
 
 
+# Fetches upcoming URLs on worker threads; callers still consume results in their own order.
+# With `parse`, prefetched pages are also parsed on the worker so parsing overlaps the
+# caller's DB waits; fetch() then returns the parsed object (None when not pre-parsed).
+# With `validators` (url -> {"etag", "modified"}), fetches are conditional GETs.
+class PrefetchPool:
+
+    def __init__(
+        self,
+        headers: dict,
+        workers: int,
+        parse: Optional[Callable[[str], Any]] = None,
+        validators: Optional[dict[str, dict]] = None,
+    ):
+        self._headers = headers
+        self._parse = parse
+        self._validators = validators
+        self._workers = max(1, workers)
+        self._executor = (
+            ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="prefetch")
+            if self._workers > 1
+            else None
+        )
+        self._inflight: dict[str, Future] = {}
+
+    def prefetch(self, urls: Iterable[str], limit: int | None = None) -> None:
+        if self._executor is None:
+            return
+        window = self._workers if limit is None else min(self._workers, limit)
+        for url in urls:
+            if len(self._inflight) >= window:
+                break
+            if url in self._inflight:
+                continue
+            self._inflight[url] = self._executor.submit(self._fetch_one, url)
+
+    def _get(self, url: str) -> tuple[Optional[str], Optional[str]]:
+        if self._validators is None:
+            return fetch_url(url, self._headers)
+        return fetch_url(url, self._headers, self._validators.setdefault(url, {}))
+
+    def _fetch_one(self, url: str) -> tuple[Optional[str], Optional[str], Any]:
+        html, err = self._get(url)
+        parsed = None
+        if self._parse is not None and html:
+            try:
+                parsed = self._parse(html)
+            except Exception:
+                parsed = None
+        return html, err, parsed
+
+    def fetch(self, url: str) -> tuple[Optional[str], Optional[str], Any]:
+        fut = self._inflight.pop(url, None)
+        if fut is None:
+            html, err = self._get(url)
+            return html, err, None
+        return fut.result()
+
+    def discard(self) -> None:
+        for fut in self._inflight.values():
+            fut.cancel()
+        self._inflight.clear()
+
+    def close(self) -> None:
+        self.discard()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    # lxml's C parser is much faster than html.parser; fall back if it is not installed.
+    try:
+        return BeautifulSoup(html, "lxml")
+    except FeatureNotFound:
+        return BeautifulSoup(html, "html.parser")
+
+
 def extract_main_text(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
+    return extract_main_text_from_soup(make_soup(html))
+
 
+def extract_main_text_from_soup(soup: BeautifulSoup) -> str:
+    # Strips script/style/noscript from the soup in place.
     for tag in soup(["script", "style", "noscript"]):
         tag.decompose()
 
@@ -8,7 +8,10 @@ import signal
 import sys
 import time
 import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urljoin, urlparse, urldefrag
@@ -16,24 +19,43 @@ from urllib.parse import urljoin, urlparse, urldefrag
 from bs4 import BeautifulSoup, FeatureNotFound
 import requests
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from backend.db import (
     finish_ingest_run,
     get_source_id,
     should_extract_entities,
     start_ingest_run,
     get_client,
-    upsert_feed_item,
+    upsert_feed_items,
+    upsert_rows,
     enqueue_fetch,
-    is_source_in_cooldown,
+    get_cooldown_set,
     mark_source_blocked,
     get_article_id_by_url,
-    upsert_entities_for_article,
+    upsert_entities_for_articles,
+    update_feed_item_entities,
+)
+from backend.ollama import (
+    extract_entities_cached,
+    is_ollama_healthy,
+    log_entity_cache_stats,
+    start_ollama_warmup,
+)
+from backend.config import get_bool, get_int, state_dir
+from .extract import (
+    HEADERS,
+    PrefetchPool,
+    extract_main_text_from_soup,
+    fetch_url,
+    make_soup,
 )
-from backend.ollama import extract_entities, is_ollama_healthy
-from backend.config import get_bool, get_int
-from .extract import HEADERS, extract_main_text, fetch_url
 
 _article_col_cache: dict[str, bool] = {}
+_substring_re_cache: dict[tuple[str, ...], re.Pattern] = {}
 
 
 def _article_has_column(sb, column: str) -> bool:
@@ -51,6 +73,49 @@ def _article_has_column(sb, column: str) -> bool:
     return _article_col_cache[column]
 
 
+def _json_loads(text):
+    # orjson when available; stdlib json still decides anything orjson rejects.
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except ValueError:
+            pass
+    return json.loads(text)
+
+
+def _load_seed_cache(path: Path, ttl: int) -> dict[str, tuple[float, list[str]]]:
+    try:
+        data = _json_loads(path.read_bytes())
+    except Exception:
+        return {}
+    now = time.time()
+    out: dict[str, tuple[float, list[str]]] = {}
+    for link, entry in (data or {}).items():
+        try:
+            ts, links = float(entry[0]), list(entry[1])
+        except Exception:
+            continue
+        if now - ts <= ttl:
+            out[link] = (ts, links)
+    return out
+
+
+def _save_seed_cache(path: Path, cache: dict[str, tuple[float, list[str]]], ttl: int) -> None:
+    now = time.time()
+    fresh = {link: [ts, links] for link, (ts, links) in cache.items() if now - ts <= ttl}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        if orjson is not None:
+            tmp.write_bytes(orjson.dumps(fresh))
+        else:
+            tmp.write_text(json.dumps(fresh), encoding="utf-8")
+        tmp.replace(path)
+    except Exception as e:
+        # Once per run: without this file every run re-crawls the seed pages.
+        print(f"SEED_CACHE_SAVE_WARN path={path} err={type(e).__name__} persisted=0")
+
+
 def _bump_err_bucket(bs: dict, err: str) -> None:
     if not err:
         return
@@ -171,9 +236,26 @@ PROGRESS_EVERY = get_int("PROGRESS_EVERY", 5) or 5
 SKIP_BLOCKED_SOURCES = get_bool("SKIP_BLOCKED_SOURCES", True)
 SOURCE_TIME_BUDGET_SEC = get_int("SOURCE_TIME_BUDGET_SEC", 420) or 420
 FETCH_TIMING = get_bool("FETCH_TIMING", False)
+# Per-URL diagnostic lines (SUMMARY_GATE); off by default to keep job logs lean.
+VERBOSE_URL_LOG = get_bool("INGEST_VERBOSE", False)
+SEED_CACHE_PATH = Path(os.getenv("SEED_CACHE_PATH") or state_dir() / "page_seed_cache.json")
+SEED_CACHE_TTL_SEC = 6 * 60 * 60
 ALLOW_UNSMIL_TEASER_FALLBACK = get_bool("UNSMIL_ALLOW_TEASER_FALLBACK", True)
 UNSMIL_MIN_FULL_LEN = get_int("UNSMIL_MIN_FULL_LEN", 1800) or 1800
 DO_SUMMARY = os.getenv("EXTRACT_SUMMARY", "0") == "1"
+FETCH_CONCURRENCY = get_int("PAGE_FETCH_CONCURRENCY", 4) or 1
+WRITE_BATCH_SIZE = get_int("PAGE_WRITE_BATCH", 50) or 1
+ENTITY_WORKERS = get_int("ENTITY_WORKERS", 2) or 1
+ENTITY_MAX_INFLIGHT = get_int("ENTITY_MAX_INFLIGHT", 50) or 1
+OPTIONAL_ARTICLE_COLUMNS = (
+    "source_id",
+    "source_name",
+    "content_kind",
+    "verification_status",
+    "fetch_quality",
+    "last_seen_at",
+    "content_hash",
+)
 def parse_source_ids_env() -> set[str] | None:
     raw = os.getenv("SOURCE_IDS", "").strip()
     if not raw:
@@ -271,7 +353,7 @@ def has_article_meta(soup: BeautifulSoup) -> bool:
         return True
     for script in soup.find_all("script", attrs={"type": "application/ld+json"}):
         try:
-            data = json.loads(script.string or "")
+            data = _json_loads(script.string or "")
         except Exception:
             continue
         items = data if isinstance(data, list) else [data]
@@ -286,9 +368,7 @@ def has_article_meta(soup: BeautifulSoup) -> bool:
     return False
 
 
-def extract_published_at(html: str) -> Optional[str]:
-    soup = BeautifulSoup(html, "html.parser")
-
+def extract_published_at(soup: BeautifulSoup) -> Optional[str]:
     meta_keys = [
         ("property", "article:published_time"),
         ("property", "og:published_time"),
@@ -312,15 +392,42 @@ def extract_published_at(html: str) -> Optional[str]:
     return None
 
 
+def _substring_re(tokens: list[str]) -> re.Pattern:
+    # One compiled alternation per token list instead of an `in` check per token.
+    key = tuple(tokens)
+    pattern = _substring_re_cache.get(key)
+    if pattern is None:
+        pattern = re.compile("|".join(re.escape(t) for t in key))
+        _substring_re_cache[key] = pattern
+    return pattern
+
+
 def looks_like_index(url: str, deny_substrings: list[str]) -> bool:
     u = url.lower()
-    if any(d in u for d in deny_substrings):
+    if deny_substrings and _substring_re(deny_substrings).search(u):
         return True
     if u.rstrip("/").endswith(("/blog", "/news", "/announcements", "/press-releases", "/press")):
         return True
     return False
 
 
+def _url_root(url: str) -> Optional[str]:
+    p = urlparse(url)
+    if p.scheme and p.netloc:
+        return f"{p.scheme}://{p.netloc}"
+    return None
+
+
+def _join_href(base_url: str, base_root: Optional[str], href: str) -> str:
+    # Absolute and plain root-relative hrefs resolve without re-parsing the base;
+    # anything with dot segments or a relative path goes through urljoin.
+    if href.startswith(("http://", "https://")):
+        return href
+    if base_root and href.startswith("/") and not href.startswith("//") and "/." not in href:
+        return base_root + href
+    return urljoin(base_url, href)
+
+
 def extract_internal_links(
     html: str,
     base_url: str,
@@ -328,8 +435,9 @@ def extract_internal_links(
     allow_substrings: Optional[list[str]] = None,
     deny_substrings: Optional[list[str]] = None,
 ) -> list[str]:
-    soup = BeautifulSoup(html, "html.parser")
+    soup = make_soup(html)
     base = urlparse(base_url)
+    base_root = _url_root(base_url)
     seen = set()
     links = []
     keywords = (
@@ -355,7 +463,7 @@ def extract_internal_links(
         if href.startswith("mailto:") or href.startswith("javascript:"):
             continue
 
-        abs_url = urljoin(base_url, href)
+        abs_url = _join_href(base_url, base_root, href)
         parsed = urlparse(abs_url)
         if parsed.scheme not in ("http", "https"):
             continue
@@ -387,9 +495,13 @@ def discover_article_links(
     html: str,
     max_links: int = 30,
     debug: bool = False,
+    hrefs: Optional[list[str]] = None,
 ) -> tuple[list[str], dict]:
-    soup = BeautifulSoup(html, "html.parser")
+    # hrefs: raw <a href> values already collected from a parsed page; skips re-parsing html.
+    if hrefs is None:
+        hrefs = [a.get("href", "") for a in make_soup(html).select("a[href]")]
     base = urlparse(seed_url)
+    base_root = _url_root(seed_url)
     out = []
     seen = set()
     lo_prefixes = {
@@ -414,15 +526,15 @@ def discover_article_links(
     internal_seen = set()
     is_lo = base.netloc == "libyaobserver.ly"
 
-    for a in soup.select("a[href]"):
+    for href in hrefs:
         stats["a_count"] += 1
-        href = a.get("href", "").strip()
+        href = href.strip()
         if not href:
             continue
         if href.startswith("javascript:"):
             continue
 
-        u = urljoin(seed_url, href)
+        u = _join_href(seed_url, base_root, href)
         u = _normalize_url(u)
         p = urlparse(u)
 
@@ -536,7 +648,7 @@ def fetch_views_ajax_links(source: dict, base_url: str) -> tuple[list[str], dict
             chunks.append(item["data"])
     html = "\n".join(chunks)
     teasers: dict[str, dict] = {}
-    soup = BeautifulSoup(html, "html.parser")
+    soup = make_soup(html)
     for article in soup.select("article"):
         a = article.find("a", href=True)
         if not a:
@@ -797,10 +909,13 @@ def filter_source_urls(source: dict, urls: list[str]) -> list[str]:
     exclude_prefixes = source.get("sitemap_exclude_prefixes") or []
     link_allow = source.get("link_allow") or []
     link_deny = source.get("link_deny") or []
+    allow_re = _substring_re(link_allow) if link_allow else None
+    deny_re = _substring_re(link_deny) if link_deny else None
+    source_id = source.get("id")
     out = []
     for u in urls:
-        if source.get("id") == "libya_observer":
-            p = urlparse(u)
+        p = urlparse(u)
+        if source_id == "libya_observer":
             parts = [s for s in p.path.split("/") if s]
             if len(parts) < 2:
                 continue
@@ -821,8 +936,7 @@ def filter_source_urls(source: dict, urls: list[str]) -> list[str]:
                 continue
             if len(parts[-1]) < 3:
                 continue
-        if source.get("id") == "libya_review":
-            p = urlparse(u)
+        if source_id == "libya_review":
             if p.netloc not in {"libyareview.com", "www.libyareview.com"}:
                 continue
             if p.query:
@@ -837,16 +951,16 @@ def filter_source_urls(source: dict, urls: list[str]) -> list[str]:
             # Accept WP-style dates or sluggy paths.
             if not ARTICLE_HINT_RE.search(p.path) and len(parts[-1]) < 5:
                 continue
-        path = urlparse(u).path
+        path = p.path
         if include_prefixes:
             if not any(path.startswith(p) for p in include_prefixes):
                 if not (include_non_en and not path.startswith("/en/")):
                     continue
         if exclude_prefixes and any(path.startswith(p) for p in exclude_prefixes):
             continue
-        if link_allow and not any(tok in path for tok in link_allow):
+        if allow_re and not allow_re.search(path):
             continue
-        if link_deny and any(tok in path for tok in link_deny):
+        if deny_re and deny_re.search(path):
             continue
         out.append(u)
     return out
@@ -892,8 +1006,24 @@ def is_article_like(html: str, content: str, title: Optional[str], url: str | No
     return len(c) >= 600
 
 
+_DROP_QUERY_KEYS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "ref",
+        "ref_src",
+    }
+)
+
+
+# The same URLs are normalized repeatedly (seed lists, discovery, dedup, writes).
+@lru_cache(maxsize=65536)
 def _normalize_url(u: str) -> str:
-    clean = urldefrag(u).url
+    clean = urldefrag(u).url if "#" in u else u
     p = urlparse(clean)
     scheme = (p.scheme or "https").lower()
     host = (p.netloc or "").lower()
@@ -904,16 +1034,6 @@ def _normalize_url(u: str) -> str:
         path = path[: -len("/amp")] or "/"
     if path != "/" and path.endswith("/"):
         path = path.rstrip("/")
-    drop_keys = {
-        "fbclid",
-        "gclid",
-        "yclid",
-        "igshid",
-        "mc_cid",
-        "mc_eid",
-        "ref",
-        "ref_src",
-    }
     keep_params = []
     for part in p.query.split("&"):
         if not part:
@@ -921,7 +1041,7 @@ def _normalize_url(u: str) -> str:
         key = part.split("=", 1)[0].lower()
         if key.startswith("utm_"):
             continue
-        if key in drop_keys:
+        if key in _DROP_QUERY_KEYS:
             continue
         if key == "amp":
             continue
@@ -950,6 +1070,19 @@ def _get_existing_urls(sb, urls: list[str]) -> set[str]:
     return existing
 
 
+def _prime_existing_cache(sb, urls: list[str], exists_cache: dict[str, bool]) -> set[str]:
+    # One batched lookup for every URL not already classified; later per-link
+    # insert-vs-update checks then resolve from the cache.
+    unknown = [u for u in dict.fromkeys(urls) if u not in exists_cache]
+    if unknown:
+        found = _get_existing_urls(sb, unknown)
+        for u in found:
+            exists_cache[u] = True
+        for u in unknown:
+            exists_cache.setdefault(u, False)
+    return {u for u in urls if exists_cache.get(u)}
+
+
 def _get_existing_refresh_info(sb, urls: list[str]) -> dict[str, dict]:
     info: dict[str, dict] = {}
     chunk_size = 200
@@ -959,15 +1092,12 @@ def _get_existing_refresh_info(sb, urls: list[str]) -> dict[str, dict]:
         try:
             res = (
                 sb.table("articles")
-                .select("url,last_seen_at,content_hash,content")
+                .select("url,last_seen_at,content_hash")
                 .in_("url", chunk)
                 .execute()
             )
         except Exception:
-            try:
-                res = sb.table("articles").select("url,content").in_("url", chunk).execute()
-            except Exception:
-                res = sb.table("articles").select("url").in_("url", chunk).execute()
+            res = sb.table("articles").select("url").in_("url", chunk).execute()
         for row in res.data or []:
             url = row.get("url")
             if not url:
@@ -976,7 +1106,6 @@ def _get_existing_refresh_info(sb, urls: list[str]) -> dict[str, dict]:
             info[nu] = {
                 "last_seen_at": row.get("last_seen_at"),
                 "content_hash": row.get("content_hash"),
-                "content": row.get("content"),
             }
     return info
 
@@ -1356,7 +1485,7 @@ def _finalize_incremental(
     seed_total: int,
     seed_mode: str,
     remaining_global: int,
-    pending_links: list[str],
+    pending_links: deque[str],
     visited: set[str],
     max_pages: int,
 ):
@@ -1517,6 +1646,7 @@ def main():
         print("JOB_LOCKED exit=1")
         return 1
     run_id = start_ingest_run(sb, "page_ingest")
+    article_cols = {col: _article_has_column(sb, col) for col in OPTIONAL_ARTICLE_COLUMNS}
     debug_lo = os.getenv("DEBUG_LO") == "1"
     stats = {
         "total": 0,
@@ -1611,11 +1741,160 @@ def main():
             ollama_ok = False
             stats["llm_unavailable"] += 1
             stats["warnings"] = ["ollama_unreachable"]
+        else:
+            start_ollama_warmup()
         stats["llm_available"] = ollama_ok
 
+    def _run_entities(feed_item: dict) -> tuple[dict, Optional[str]]:
+        # Runs on entity worker threads; returns (feed_items.entities payload, error).
+        try:
+            ents = extract_entities_cached(
+                sb,
+                title=feed_item.get("title"),
+                summary=feed_item.get("summary"),
+                content=feed_item.get("content"),
+                lang=feed_item.get("language"),
+            )
+            return ents, None
+        except Exception:
+            err = traceback.format_exc()
+            return {"_entity_error": err[:800]}, err
+
+    # Ollama calls run on a small pool so crawling continues while the LLM is busy.
+    entity_pool = None
+    if ollama_ok and ENTITY_WORKERS > 1 and get_bool("EXTRACT_ENTITIES", False):
+        entity_pool = ThreadPoolExecutor(max_workers=ENTITY_WORKERS)
+    entity_pending: deque[tuple[str, dict, Optional[int], Future]] = deque()
+    fetch_pool: Optional[PrefetchPool] = None
+
+    def _drain_entities(wait: bool = False) -> None:
+        # Collect finished entity jobs in submission order and write their payloads.
+        updates: list[dict] = []
+        links: list[tuple] = []
+        while entity_pending and (
+            wait
+            or entity_pending[0][2].done()
+            or len(entity_pending) > ENTITY_MAX_INFLIGHT
+        ):
+            source_key, feed_item, article_id, fut = entity_pending.popleft()
+            payload, err = fut.result()
+            if err:
+                print("ENTITY ERROR FULL:\n", err)
+                bs = _bs(source_key)
+                stats["llm_failed"] += 1
+                bs["llm_failed"] += 1
+                bs["last_error"] = "entity_error"
+            else:
+                links.append((article_id, payload))
+            updates.append(
+                {
+                    "external_id": feed_item.get("external_id"),
+                    "hash": feed_item.get("hash"),
+                    "entities": payload,
+                }
+            )
+        if links:
+            try:
+                upsert_entities_for_articles(sb, links)
+            except Exception as e:
+                print(f"ENTITY_LINK_FAILED rows={len(links)} err={type(e).__name__}")
+        if updates:
+            try:
+                update_feed_item_entities(sb, updates)
+            except Exception as e:
+                print(f"ENTITY_UPDATE_FAILED rows={len(updates)} err={type(e).__name__}")
+
+    # Accepted pages are written in batches; each entry carries the feed item,
+    # article row and insert-vs-update flag for one URL.
+    write_buffer: list[dict] = []
+
+    def _flush_writes() -> None:
+        nonlocal saved_count
+        if not write_buffer:
+            return
+        batch = list(write_buffer)
+        write_buffer.clear()
+        phase_ts = time.monotonic()
+        try:
+            upsert_feed_items(sb, [entry["feed_item"] for entry in batch])
+        except Exception as e:
+            print(f"FEED_ITEMS_BATCH_FAILED rows={len(batch)} err={type(e).__name__}")
+            kept = []
+            for entry in batch:
+                try:
+                    upsert_feed_items(sb, [entry["feed_item"]])
+                except Exception as row_err:
+                    bs = _bs(entry["source_key"])
+                    stats["failed"] += 1
+                    bs["failed"] += 1
+                    bs["last_error"] = f"feed_item_upsert_error:{type(row_err).__name__}"
+                    print(f"Feed item upsert failed for {entry['link']}: {row_err}")
+                    url_exists_cache[entry["norm_link"]] = entry["exists"]
+                    continue
+                kept.append(entry)
+            batch = kept
+
+        ids: dict[str, int] = {}
+        written = batch
+        try:
+            rows = upsert_rows(sb, "articles", [entry["article_row"] for entry in batch], "url")
+            ids = {row.get("url"): row.get("id") for row in rows if row.get("url")}
+        except Exception as e:
+            print(f"ARTICLES_BATCH_FAILED rows={len(batch)} err={type(e).__name__}")
+            written = []
+            for entry in batch:
+                try:
+                    rows = upsert_rows(sb, "articles", [entry["article_row"]], "url")
+                except Exception as row_err:
+                    bs = _bs(entry["source_key"])
+                    stats["failed"] += 1
+                    bs["failed"] += 1
+                    bs["last_error"] = f"article_upsert_error:{type(row_err).__name__}"
+                    print(f"Article upsert failed for {entry['link']}: {row_err}")
+                    url_exists_cache[entry["norm_link"]] = entry["exists"]
+                    continue
+                for row in rows:
+                    if row.get("url"):
+                        ids[row["url"]] = row.get("id")
+                written.append(entry)
+        print(
+            f"WRITE_FLUSH rows={len(batch)} written={len(written)} "
+            f"ms={int((time.monotonic() - phase_ts) * 1000)}"
+        )
+
+        for entry in written:
+            bs = _bs(entry["source_key"])
+            norm_link = entry["norm_link"]
+            if entry["exists"]:
+                stats["updated_existing"] = stats.get("updated_existing", 0) + 1
+                bs["updated_existing"] = bs.get("updated_existing", 0) + 1
+            else:
+                stats["saved"] += 1
+                bs["saved"] += 1
+                saved_count += 1
+            stats["summary_skipped"] += 1
+            bs["summary_skipped"] += 1
+            feed_item = entry["feed_item"]
+            if ollama_ok and should_extract_entities(feed_item):
+                article_id = ids.get(norm_link) or get_article_id_by_url(sb, norm_link)
+                if entity_pool is not None:
+                    fut = entity_pool.submit(_run_entities, feed_item)
+                else:
+                    fut = Future()
+                    fut.set_result(_run_entities(feed_item))
+                entity_pending.append((entry["source_key"], feed_item, article_id, fut))
+            if entry["exists"]:
+                print(f"Updated: {entry['link']}")
+            else:
+                print(f"Saved: {entry['link']}")
+        _drain_entities(wait=entity_pool is None)
+
     lo_debug_printed = False
-    seed_cache: dict[str, tuple[float, list[str]]] = {}
-    seed_cache_ttl = 6 * 60 * 60
+    # Seed page -> (ts, candidate links); persisted so a DNS failure on the next
+    # run can still fall back to recently discovered links.
+    seed_cache_ttl = SEED_CACHE_TTL_SEC
+    seed_cache = _load_seed_cache(SEED_CACHE_PATH, seed_cache_ttl)
+    cooldown_sources = get_cooldown_set(sb) if SKIP_BLOCKED_SOURCES else set()
 
     try:
         source_count = 0
@@ -1626,7 +1905,7 @@ def main():
             source_key = source.get("id")
             if source_key in blocked_sources:
                 continue
-            if SKIP_BLOCKED_SOURCES and is_source_in_cooldown(sb, source_key):
+            if source_key in cooldown_sources:
                 continue
             page_url = source.get("seed_url") or source.get("url")
             if not page_url:
@@ -1722,13 +2001,13 @@ def main():
 
             visited = set()
             strategy = STRATEGIES.get(source_key)
-            pending_links = list(links)
+            pending_links = deque(links)
             seed_norms = { _normalize_url(u) for u in links if u }
             sitemap_urls = set()
             saved_count = 0
             processed_count = 0
-            existing_url_cache: set[str] = set()
-            missing_url_cache: set[str] = set()
+            # normalized url -> already stored in articles
+            url_exists_cache: dict[str, bool] = {}
             views_teasers: dict[str, dict] = {}
             sitemap_seeded = bool(source.get("sitemap_seed_only"))
             if sitemap_seeded:
@@ -1737,8 +2016,13 @@ def main():
             strat_seed_total = len(strat_seed_urls)
             strat_candidates: list[str] = []
             strat_seed_done = False
+            # normalized url -> refresh info for rows already stored; presence means existing.
             strat_existing_info: dict[str, dict] = {}
-            strat_existing_set: set[str] = set()
+            try:
+                source_uuid = get_source_id(sb, source_key)
+            except ValueError:
+                source_uuid = None
+            credibility = infer_credibility(source.get("type"))
             strat_refresh_allowed: set[str] = set()
 
             if source.get("views_ajax"):
@@ -1753,11 +2037,11 @@ def main():
                     bs["discovered_total"] += len(links)
                     bs["kept_total"] += len(links)
                     bs["kept_candidates"] += len(links)
-                    pending_links = list(links)
+                    pending_links = deque(links)
                     seed_norms = { _normalize_url(u) for u in links if u }
 
             if strategy and strategy.incremental and source.get("_seed_mode") in {"sitemap", "rss"}:
-                pending_links = []
+                pending_links = deque()
                 bs = _bs(source_key)
                 bs["seed_pages_fetched"] += 1
                 strat_candidates = list(links)
@@ -1779,38 +2063,54 @@ def main():
                 )
                 remaining_global = max(0, remaining_global - selected_count)
 
+            if pending_links:
+                try:
+                    _prime_existing_cache(
+                        sb, [_normalize_url(u) for u in pending_links if u], url_exists_cache
+                    )
+                except Exception:
+                    pass
+
+            fetch_workers = int(source.get("fetch_concurrency") or FETCH_CONCURRENCY)
+            if delay_min_ms or delay_max_ms:
+                # Per-domain politeness delays imply one request at a time.
+                fetch_workers = 1
+            fetch_pool = PrefetchPool(HEADERS, fetch_workers, parse=make_soup)
+            bs = _bs(source_key)
+            bs.setdefault("updated_existing", 0)
+            stats.setdefault("updated_existing", 0)
+
             while pending_links and processed_count < MAX_PAGES_PER_SOURCE:
                 if terminate:
                     aborted = True
                     error_msg = "terminated"
                     break
                 if SOURCE_TIME_BUDGET_SEC and time.monotonic() - source_started > SOURCE_TIME_BUDGET_SEC:
-                    bs = _bs(source_key)
                     bs["last_error"] = "source_time_budget"
                     print(f"Source time budget reached: {source_key}")
                     break
-                link = pending_links.pop(0)
+                fetch_pool.prefetch(
+                    # visited links are always in seen_urls by the time they are dequeued again.
+                    (u for u in pending_links if u not in seen_urls),
+                    limit=MAX_PAGES_PER_SOURCE - processed_count,
+                )
+                link = pending_links.popleft()
                 if link in visited:
                     continue
                 visited.add(link)
+                norm_link = _normalize_url(link)
                 processed_count += 1
                 if link in seen_urls:
                     stats["skipped"] += 1
-                    bs = _bs(source_key)
                     bs["skipped"] += 1
                     print(f"Skipped: {link}")
                     continue
 
                 seen_urls.add(link)
                 stats["total"] += 1
-                bs = _bs(source_key)
                 bs["total"] += 1
-                bs.setdefault("updated_existing", 0)
-                stats.setdefault("updated_existing", 0)
                 processed += 1
-                is_seed_page = False
-                if _normalize_url(link) in seed_norms:
-                    is_seed_page = True
+                is_seed_page = norm_link in seed_norms
                 if strategy and strategy.incremental and source.get("_seed_mode") == "category":
                     if link in strat_seed_urls:
                         is_seed_page = True
@@ -1826,7 +2126,7 @@ def main():
                 try:
                     # Count every fetch attempt (even seed pages) to keep saved <= attempted.
                     bs["attempted"] += 1
-                    html, err = fetch_url(link, HEADERS)
+                    html, err, pre_soup = fetch_pool.fetch(link)
                     fetch_ms = int((time.monotonic() - phase_ts) * 1000)
                     phase_ts = time.monotonic()
                     if err:
@@ -1871,6 +2171,7 @@ def main():
                         content = teaser.get("summary") or ""
                         article_meta = True
                         link_count = 0
+                        page_hrefs = None
                         text_len = len((content or "").strip())
                         link_density = 0.0
                         parse_ms = int((time.monotonic() - phase_ts) * 1000)
@@ -1878,7 +2179,10 @@ def main():
                         stats["used_teaser"] = stats.get("used_teaser", 0) + 1
                         bs["used_teaser"] = bs.get("used_teaser", 0) + 1
                     else:
-                        soup = BeautifulSoup(html or "", "html.parser")
+                        soup = pre_soup if pre_soup is not None else make_soup(html or "")
+                        all_anchors = soup.find_all("a")
+                        link_count = len(all_anchors)
+                        page_hrefs = [a.get("href", "") for a in all_anchors if a.has_attr("href")]
                         if (
                             source_key == "libya_observer"
                             and is_libya_observer_index(link)
@@ -1887,18 +2191,19 @@ def main():
                         ):
                             urls = []
                             seen = set()
-                            for a in soup.find_all("a", href=True):
-                                href = a.get("href", "").strip()
+                            link_root = _url_root(link)
+                            for href in page_hrefs:
+                                href = href.strip()
                                 if not href:
                                     continue
-                                abs_url = urljoin(link, href)
+                                abs_url = _join_href(link, link_root, href)
                                 if abs_url in seen:
                                     continue
                                 seen.add(abs_url)
                                 urls.append(abs_url)
                             print(
                                 f"LO_DEBUG status=200 bytes={len((html or '').encode('utf-8'))} "
-                                f"a_count={len(soup.find_all('a'))}"
+                                f"a_count={link_count}"
                             )
                             for u in urls[:20]:
                                 print(f"LO_DEBUG_URL {u}")
@@ -1918,10 +2223,13 @@ def main():
                         print(f"Skipped (not article meta): {link}")
                         log_timing(link, t0, fetch_ms, parse_ms, summarize_ms, db_ms)
                         continue
+                    index_page = (is_seed_page and not article_meta) or (
+                        source_key == "libya_observer" and is_libya_observer_index(link)
+                    )
                     if not used_teaser:
-                        content = extract_main_text(html or "")
+                        # Seed/index pages only feed link discovery, so skip body extraction.
+                        content = "" if index_page else extract_main_text_from_soup(soup)
                         parse_ms = int((time.monotonic() - phase_ts) * 1000)
-                        link_count = len(soup.find_all("a"))
                         text_len = len((content or "").strip())
                         link_density = (link_count / max(text_len, 1)) if text_len else 1.0
                 except Exception as e:
@@ -1935,13 +2243,12 @@ def main():
                     log_timing(link, t0, fetch_ms, parse_ms, summarize_ms, db_ms)
                     continue
 
-                article_like = is_article_like(html, content, title, link)
-                if is_seed_page and not article_meta:
+                if index_page:
                     article_like = False
-                if used_teaser:
+                elif used_teaser:
                     article_like = True
-                if source_key == "libya_observer" and is_libya_observer_index(link):
-                    article_like = False
+                else:
+                    article_like = is_article_like(html, content, title, link)
                 if not article_like:
                     prefer_sitemap = bool(source.get("prefer_sitemap"))
                     disable_harvest = bool(source.get("disable_harvest"))
@@ -1974,7 +2281,11 @@ def main():
                         if source.get("link_allow") or source.get("link_deny"):
                             disc_limit = 200
                         discovered, disc_stats = discover_article_links(
-                            link, html, max_links=disc_limit, debug=source_key == "libya_observer"
+                            link,
+                            html,
+                            max_links=disc_limit,
+                            debug=source_key == "libya_observer",
+                            hrefs=page_hrefs,
                         )
                         discovered = filter_source_urls(source, discovered)
                     if not discovered and not disable_harvest:
@@ -2012,7 +2323,7 @@ def main():
                         kept_candidates = discovered
                         if source_key == "libya_observer":
                             news_bucket = [u for u in kept_candidates if "/news/" in u]
-                            other_bucket = [u for u in kept_candidates if u not in news_bucket]
+                            other_bucket = [u for u in kept_candidates if "/news/" not in u]
                             kept_candidates = news_bucket + other_bucket
                         new_candidates = kept_candidates
                         deduped = 0
@@ -2064,10 +2375,9 @@ def main():
                             continue
                         try:
                             normalized = [_normalize_url(u) for u in kept_candidates]
-                            existing = _get_existing_urls(sb, normalized)
+                            existing = _prime_existing_cache(sb, normalized, url_exists_cache)
                             new_candidates = [u for u in normalized if u not in existing]
                             deduped = len(normalized) - len(new_candidates)
-                            bs = _bs(source_key)
                             bs["deduped_existing"] = deduped
                             bs["new_candidates"] = len(new_candidates)
                             bs["kept_candidates"] = len(normalized)
@@ -2137,9 +2447,7 @@ def main():
                         log_timing(link, t0, fetch_ms, parse_ms, summarize_ms, db_ms)
                         continue
 
-                try:
-                    source_uuid = get_source_id(sb, source_key)
-                except ValueError:
+                if source_uuid is None:
                     stats["skipped"] += 1
                     bs["skipped"] += 1
                     print(f"Skipped (source not seeded in sources table): {source_key}")
@@ -2168,11 +2476,12 @@ def main():
                     fetch_quality = 0
 
                 summary = ""
-                print(f"SUMMARY_GATE do_summary={DO_SUMMARY} url={link}")
+                if VERBOSE_URL_LOG:
+                    print(f"SUMMARY_GATE do_summary={DO_SUMMARY} url={link}")
 
-                norm_link = _normalize_url(link)
                 existing_feed = {}
-                if _quality_rank(content_kind) < 3:
+                cur_rank = _quality_rank(content_kind)
+                if cur_rank < 3:
                     existing_feed = _get_existing_quality(sb, "feed_items", norm_link)
                     existing_kind = existing_feed.get("content_kind")
                     existing_content = existing_feed.get("content") or ""
@@ -2180,11 +2489,9 @@ def main():
                         len(existing_content.strip()) < UNSMIL_MIN_FULL_LEN
                         or _is_blocked_text(existing_content)
                     )
-                    if (
-                        _quality_rank(existing_kind) > _quality_rank(content_kind)
-                        and not existing_short
-                    ):
+                    if _quality_rank(existing_kind) > cur_rank and not existing_short:
                         content_kind = existing_feed.get("content_kind") or content_kind
+                        cur_rank = _quality_rank(content_kind)
                         verification_status = (
                             existing_feed.get("verification_status") or verification_status
                         )
@@ -2196,6 +2503,9 @@ def main():
                         if existing_feed.get("summary"):
                             summary = existing_feed.get("summary") or summary
 
+                language = infer_language(link)
+                if language == "unknown":
+                    language = source.get("language") or language
                 feed_item = {
                     "source_id": source_uuid,
                     "source_type": "article",
@@ -2207,34 +2517,30 @@ def main():
                     "content_kind": content_kind,
                     "verification_status": verification_status,
                     "fetch_quality": fetch_quality,
-                    "language": infer_language(link),
-                    "published_at": extract_published_at(html),
+                    "language": language,
+                    "published_at": None if used_teaser else extract_published_at(soup),
                     "raw": {"source": source, "url": link},
                 }
 
-                phase_ts = time.monotonic()
-                upsert_feed_item(sb, feed_item)
-                db_ms = int((time.monotonic() - phase_ts) * 1000)
-
                 try:
-                    content_hash_val = _content_hash_str(content)
+                    content_hash_val = None
                     content_changed = True
                     is_existing = False
                     if source_key == "libya_observer":
-                        is_existing = norm_link in strat_existing_set
+                        # Only libya_observer stores/compares content hashes.
+                        content_hash_val = _content_hash_str(content)
                         existing_info = strat_existing_info.get(norm_link)
+                        is_existing = existing_info is not None
                         if existing_info:
                             existing_hash = existing_info.get("content_hash")
-                            if not existing_hash and existing_info.get("content") is not None:
-                                existing_hash = _content_hash_str(existing_info.get("content") or "")
                             if existing_hash and existing_hash == content_hash_val:
                                 content_changed = False
                     set_summary_pending = True
                     if source_key == "libya_observer" and is_existing and not content_changed:
                         set_summary_pending = False
-                    article_id = None
                     existing_article = {}
-                    if _quality_rank(content_kind) < 3:
+                    # A URL already classified as not in articles has no stored copy to prefer.
+                    if cur_rank < 3 and url_exists_cache.get(norm_link) is not False:
                         existing_article = _get_existing_quality(sb, "articles", norm_link)
                         existing_kind = existing_article.get("content_kind")
                         existing_content = existing_article.get("content") or ""
@@ -2242,10 +2548,7 @@ def main():
                             len(existing_content.strip()) < UNSMIL_MIN_FULL_LEN
                             or _is_blocked_text(existing_content)
                         )
-                        if (
-                            _quality_rank(existing_kind) > _quality_rank(content_kind)
-                            and not existing_short
-                        ):
+                        if _quality_rank(existing_kind) > cur_rank and not existing_short:
                             content_kind = existing_article.get("content_kind") or content_kind
                             verification_status = (
                                 existing_article.get("verification_status") or verification_status
@@ -2266,94 +2569,60 @@ def main():
                         "content": content,
                         "summary": summary,
                         "language": feed_item.get("language"),
-                        "credibility": infer_credibility(source.get("type")),
+                        "credibility": credibility,
                     }
-                    if _article_has_column(sb, "source_id"):
+                    if article_cols["source_id"]:
                         article_row["source_id"] = source_key
-                    if _article_has_column(sb, "source_name"):
+                    if article_cols["source_name"]:
                         article_row["source_name"] = source.get("name") or source_key
-                    if _article_has_column(sb, "content_kind"):
+                    if article_cols["content_kind"]:
                         article_row["content_kind"] = content_kind
-                    if _article_has_column(sb, "verification_status"):
+                    if article_cols["verification_status"]:
                         article_row["verification_status"] = verification_status
-                    if _article_has_column(sb, "fetch_quality"):
+                    if article_cols["fetch_quality"]:
                         article_row["fetch_quality"] = fetch_quality
                     if set_summary_pending:
                         article_row["summary_status"] = "PENDING"
-                    if source_key == "libya_observer" and _article_has_column(sb, "last_seen_at"):
+                    if source_key == "libya_observer" and article_cols["last_seen_at"]:
                         article_row["last_seen_at"] = datetime.now(timezone.utc).isoformat()
-                    if source_key == "libya_observer" and _article_has_column(sb, "content_hash"):
+                    if source_key == "libya_observer" and article_cols["content_hash"]:
                         article_row["content_hash"] = content_hash_val
                     if source_key == "unsmil" and content_kind != "full":
                         enqueue_fetch(sb, source_uuid, norm_link, "blocked_html")
 
                     # Detect insert vs update for accurate per-run accounting.
-                    exists = norm_link in existing_url_cache
-                    if not exists and norm_link not in missing_url_cache:
+                    exists = url_exists_cache.get(norm_link)
+                    if exists is None:
                         try:
                             existing = _get_existing_urls(sb, [norm_link])
                             exists = norm_link in existing
                         except Exception:
                             exists = False
-                        if exists:
-                            existing_url_cache.add(norm_link)
-                        else:
-                            missing_url_cache.add(norm_link)
+                        url_exists_cache[norm_link] = exists
 
-                    sb.table("articles").upsert(article_row, on_conflict="url").execute()
-                    article_id = get_article_id_by_url(sb, norm_link)
-                    if exists:
-                        stats["updated_existing"] = stats.get("updated_existing", 0) + 1
-                        bs["updated_existing"] = bs.get("updated_existing", 0) + 1
-                    else:
-                        stats["saved"] += 1
-                        bs["saved"] += 1
-                        saved_count += 1
-                        existing_url_cache.add(norm_link)
                 except Exception as e:
                     stats["failed"] += 1
                     bs["failed"] += 1
                     bs["last_error"] = f"article_upsert_error:{type(e).__name__}"
                     print(f"Article upsert failed for {link}: {e}")
                     continue
-                stats["summary_skipped"] += 1
-                bs["summary_skipped"] += 1
-                if ollama_ok and should_extract_entities(feed_item):
-                    try:
-                        ents = extract_entities(
-                            title=feed_item.get("title"),
-                            summary=feed_item.get("summary"),
-                            content=feed_item.get("content"),
-                            lang=feed_item.get("language"),
-                        )
-                        if feed_item.get("external_id"):
-                            sb.table("feed_items").update({"entities": ents}).eq(
-                                "external_id", feed_item["external_id"]
-                            ).execute()
-                        else:
-                            sb.table("feed_items").update({"entities": ents}).eq(
-                                "hash", feed_item["hash"]
-                            ).execute()
-                        upsert_entities_for_article(sb, article_id, ents)
-                    except Exception:
-                        err = traceback.format_exc()
-                        print("ENTITY ERROR FULL:\n", err)
-                        marker = {"_entity_error": err[:800]}
-                        stats["llm_failed"] += 1
-                        bs["llm_failed"] += 1
-                        bs["last_error"] = "entity_error"
-                        if feed_item.get("external_id"):
-                            sb.table("feed_items").update({"entities": marker}).eq(
-                                "external_id", feed_item["external_id"]
-                            ).execute()
-                        else:
-                            sb.table("feed_items").update({"entities": marker}).eq(
-                                "hash", feed_item["hash"]
-                            ).execute()
-                if exists:
-                    print(f"Updated: {link}")
-                else:
-                    print(f"Saved: {link}")
+                write_buffer.append(
+                    {
+                        "source_key": source_key,
+                        "link": link,
+                        "norm_link": norm_link,
+                        "feed_item": feed_item,
+                        "article_row": article_row,
+                        "exists": exists,
+                    }
+                )
+                # Queued rows count as existing, so a second raw link with the same
+                # normalized URL in this batch is reported as an update, not a save.
+                url_exists_cache[norm_link] = True
+                if len(write_buffer) >= WRITE_BATCH_SIZE:
+                    phase_ts = time.monotonic()
+                    _flush_writes()
+                    db_ms = int((time.monotonic() - phase_ts) * 1000)
                 if PROGRESS_EVERY and processed % PROGRESS_EVERY == 0:
                     elapsed = int(time.monotonic() - started_ts)
                     print(
@@ -2363,6 +2632,8 @@ def main():
                     )
                 log_timing(link, t0, fetch_ms, parse_ms, summarize_ms, db_ms)
                 _maybe_delay()
+            fetch_pool.close()
+            _flush_writes()
             if terminate:
                 aborted = True
                 error_msg = "terminated"
@@ -2403,6 +2674,29 @@ def main():
         error_msg = traceback.format_exc()[:8000]
         raise
     finally:
+        if fetch_pool is not None:
+            # Normal exits close it per source; this covers a raise mid-source.
+            fetch_pool.close()
+        if write_buffer:
+            try:
+                _flush_writes()
+            except Exception as e:
+                print(f"WRITE_FLUSH failed rows={len(write_buffer)} err={type(e).__name__}")
+        if entity_pending and aborted:
+            # Don't wait on queued LLM calls once the run has been interrupted.
+            done = [e for e in entity_pending if e[3].done() and not e[3].cancelled()]
+            entity_pending.clear()
+            entity_pending.extend(done)
+        if entity_pending:
+            try:
+                _drain_entities(wait=True)
+            except Exception as e:
+                print(f"ENTITY_DRAIN failed pending={len(entity_pending)} err={type(e).__name__}")
+        if entity_pool is not None:
+            entity_pool.shutdown(wait=False, cancel_futures=True)
+        if seed_cache:
+            _save_seed_cache(SEED_CACHE_PATH, seed_cache, seed_cache_ttl)
+        log_entity_cache_stats()
         if not finished:
             if aborted:
                 stats["aborted"] = True
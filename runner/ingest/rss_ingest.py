@@ -1,8 +1,10 @@
 import json
+import os
 import sys
 import traceback
 from pathlib import Path
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import feedparser
 
@@ -12,15 +14,52 @@ from backend.db import (
     should_extract_entities,
     start_ingest_run,
     get_client,
-    upsert_feed_item,
-    is_source_in_cooldown,
+    prepare_feed_item,
+    upsert_feed_items,
+    upsert_rows,
+    get_cooldown_set,
     mark_source_blocked,
     get_article_id_by_url,
-    upsert_entities_for_article,
+    upsert_entities_for_articles,
 )
-from backend.ollama import extract_entities, is_ollama_healthy
-from backend.config import get_bool, get_int
-from .extract import HEADERS, extract_main_text, fetch_url
+from backend.ollama import (
+    extract_entities_cached,
+    is_ollama_healthy,
+    log_entity_cache_stats,
+    start_ollama_warmup,
+)
+from backend.config import get_bool, get_int, state_dir
+from .extract import HEADERS, PrefetchPool, extract_main_text
+
+
+RSS_STATE_PATH = Path(os.getenv("RSS_STATE_PATH") or state_dir() / "rss_feed_state.json")
+RSS_PAGE_STATE_PATH = Path(os.getenv("RSS_PAGE_STATE_PATH") or state_dir() / "rss_page_state.json")
+
+_state_save_warned = False
+
+
+def load_feed_state(path: Path) -> dict[str, dict]:
+    # source id -> {"etag": ..., "modified": ...} from the last fully processed fetch
+    # (the page state file maps source id -> {url: {"etag", "modified"}} instead)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_feed_state(path: Path, state: dict[str, dict]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        tmp.replace(path)
+    except Exception as e:
+        # Unsaved validators mean unconditional GETs next run; say so once per run.
+        global _state_save_warned
+        if not _state_save_warned:
+            _state_save_warned = True
+            print(f"RSS_STATE_SAVE_WARN path={path} err={type(e).__name__} persisted=0")
 
 
 def _article_has_column(sb, column: str) -> bool:
@@ -52,6 +91,7 @@ def main():
         "skipped": 0,
         "summary_skipped": 0,
         "summary_failed": 0,
+        "not_modified": 0,
         "by_source": {},
     }
     sources_path = Path(__file__).parent / "sources.json"
@@ -76,21 +116,140 @@ def main():
                 "skipped": 0,
                 "summary_skipped": 0,
                 "summary_failed": 0,
+                "not_modified": 0,
                 "last_error": None,
             },
         )
 
+    verbose = get_bool("INGEST_VERBOSE", False)
     ollama_ok = True
     if get_bool("EXTRACT_ENTITIES", False):
         if not is_ollama_healthy():
             ollama_ok = False
             stats["llm_unavailable"] += 1
             stats["warnings"] = ["ollama_unreachable"]
+        else:
+            start_ollama_warmup()
         stats["llm_available"] = ollama_ok
 
+    article_cols = {col: _article_has_column(sb, col) for col in ("source_id", "source_name")}
+    feed_state = load_feed_state(RSS_STATE_PATH)
+    feed_state_dirty = False
+    page_state = load_feed_state(RSS_PAGE_STATE_PATH)
+    page_state_dirty = False
+    feed_workers = get_int("RSS_FEED_CONCURRENCY", 4) or 1
+    page_workers = get_int("RSS_FETCH_CONCURRENCY", 4) or 1
+    feed_pool = None
+    entity_workers = get_int("ENTITY_WORKERS", 2) or 1
+    entity_pool = None
+    if ollama_ok and entity_workers > 1 and get_bool("EXTRACT_ENTITIES", False):
+        entity_pool = ThreadPoolExecutor(max_workers=entity_workers)
+
+    def _run_entities(feed_item: dict) -> tuple[dict, str | None]:
+        # Runs on entity worker threads; returns (feed_items.entities payload, error).
+        try:
+            ents = extract_entities_cached(
+                sb,
+                title=feed_item.get("title"),
+                summary=feed_item.get("summary"),
+                content=feed_item.get("content"),
+                lang=feed_item.get("language"),
+            )
+            return ents, None
+        except Exception:
+            err = traceback.format_exc()
+            return {"_entity_error": err[:800]}, err
+
+    def _flush_feed(source_key: str, pending: list[dict]) -> list[dict]:
+        # Writes one feed's accepted entries with a bulk upsert per table; returns
+        # the entries whose article row was written. Entities are extracted first so
+        # the feed_items upsert carries them instead of a follow-up update.
+        if not pending:
+            return []
+        bs = _bs(source_key)
+        extracted: list[dict] = []
+        wanted = [
+            p for p in pending if ollama_ok and should_extract_entities(p["feed_item"])
+        ]
+        for p in wanted:
+            print(
+                "ENTITY_HOOK_REACHED",
+                p["feed_item"].get("external_id"),
+                p["feed_item"].get("hash"),
+            )
+        if entity_pool is not None and len(wanted) > 1:
+            results = entity_pool.map(_run_entities, [p["feed_item"] for p in wanted])
+        else:
+            results = map(_run_entities, [p["feed_item"] for p in wanted])
+        for p, (ents, err) in zip(wanted, results):
+            if err:
+                print("ENTITY ERROR FULL:\n", err)
+                stats["llm_failed"] += 1
+                bs["llm_failed"] += 1
+                bs["last_error"] = "entity_error"
+            else:
+                extracted.append(p)
+            p["feed_item"]["entities"] = ents
+
+        try:
+            upsert_feed_items(sb, [p["feed_item"] for p in pending])
+        except Exception as e:
+            print(f"FEED_ITEMS_BATCH_FAILED source={source_key} rows={len(pending)} err={type(e).__name__}")
+            for p in pending:
+                try:
+                    upsert_feed_items(sb, [p["feed_item"]])
+                except Exception as row_err:
+                    print(f"Feed item upsert failed for {p['link']}: {row_err}")
+        stats["summary_skipped"] += len(pending)
+        bs["summary_skipped"] += len(pending)
+
+        ids: dict[str, int] = {}
+        written = pending
+        try:
+            rows = upsert_rows(sb, "articles", [p["article_row"] for p in pending], "url")
+            ids = {row.get("url"): row.get("id") for row in rows if row.get("url")}
+        except Exception as e:
+            print(f"ARTICLES_BATCH_FAILED source={source_key} rows={len(pending)} err={type(e).__name__}")
+            written = []
+            for p in pending:
+                try:
+                    rows = upsert_rows(sb, "articles", [p["article_row"]], "url")
+                except Exception as row_err:
+                    stats["failed"] += 1
+                    bs["failed"] += 1
+                    bs["last_error"] = f"article_upsert_error:{type(row_err).__name__}"
+                    print(f"Article upsert failed for {p['link']}: {row_err}")
+                    continue
+                for row in rows:
+                    if row.get("url"):
+                        ids[row["url"]] = row.get("id")
+                written.append(p)
+
+        written_links = {p["link"] for p in written}
+        entity_links = [
+            (ids.get(p["link"]) or get_article_id_by_url(sb, p["link"]), p["feed_item"]["entities"])
+            for p in extracted
+            if p["link"] in written_links
+        ]
+        if entity_links:
+            try:
+                upsert_entities_for_articles(sb, entity_links)
+            except Exception as e:
+                print(f"ENTITY_LINK_FAILED rows={len(entity_links)} err={type(e).__name__}")
+        for p in written:
+            stats["saved"] += 1
+            bs["saved"] += 1
+            print(f"Saved: {p['title']}")
+        return written
+
+    # Entries accepted for the feed being processed; flushed in finally on an abort.
+    pending: list[dict] = []
+    pending_key: str | None = None
     try:
         source_count = 0
         max_sources = get_int("MAX_SOURCES", 0) or 0
+        cooldown_sources = get_cooldown_set(sb) if get_bool("SKIP_BLOCKED_SOURCES", True) else set()
+        eligible = []
         for source in sources:
             if not source.get("enabled"):
                 continue
@@ -99,17 +258,56 @@ def main():
             if not rss_url:
                 continue
             source_key = source.get("id")
-            if source_key in blocked_sources:
-                continue
-            if get_bool("SKIP_BLOCKED_SOURCES", True) and is_source_in_cooldown(sb, source_key):
+            if source_key in cooldown_sources:
                 continue
             source_count += 1
             if max_sources and source_count > max_sources:
                 break
+            eligible.append((source, source_key, rss_url))
 
-            feed = feedparser.parse(rss_url)
+        def _parse_feed(source_key: str, rss_url: str):
+            # Conditional GET: an unchanged feed answers 304 and is skipped entirely.
+            prev_state = feed_state.get(source_key) or {}
+            return feedparser.parse(
+                rss_url, etag=prev_state.get("etag"), modified=prev_state.get("modified")
+            )
+
+        # Feeds are fetched and parsed ahead on a small pool, then processed in order.
+        if feed_workers > 1 and len(eligible) > 1:
+            feed_pool = ThreadPoolExecutor(max_workers=feed_workers)
+            feed_futures = [feed_pool.submit(_parse_feed, key, url) for _, key, url in eligible]
+        else:
+            feed_futures = [None] * len(eligible)
+
+        for (source, source_key, rss_url), feed_fut in zip(eligible, feed_futures):
+            if source_key in blocked_sources:
+                continue
+            feed = feed_fut.result() if feed_fut is not None else _parse_feed(source_key, rss_url)
+            feed_status = feed.get("status")
+            if feed_status == 304:
+                print(f"RSS_NOT_MODIFIED source={source_key}")
+                continue
+            pending = []
+            pending_key = source_key
+            feed_incomplete = False
+            entry_links = [entry.get("link") for entry in feed.entries]
+            prev_pages = page_state.get(source_key) or {}
+            page_validators = {u: dict(prev_pages[u]) for u in entry_links if u in prev_pages}
+            unchanged_links: list[str] = []
+            # Per-feed constant article fields; entries only add their own.
+            article_template = {
+                "source": source_key,
+                "language": "unknown",
+                "credibility": None,
+                "summary_status": "PENDING",
+            }
+            if article_cols["source_id"]:
+                article_template["source_id"] = source_key
+            if article_cols["source_name"]:
+                article_template["source_name"] = source.get("name") or source_key
+            page_pool = PrefetchPool(HEADERS, page_workers, validators=page_validators)
 
-            for entry in feed.entries:
+            for idx, entry in enumerate(feed.entries):
                 title = entry.get("title")
                 link = entry.get("link")
 
@@ -124,7 +322,14 @@ def main():
                 processed += 1
 
                 try:
-                    html, err = fetch_url(link, HEADERS)
+                    page_pool.prefetch(u for u in entry_links[idx : idx + page_workers + 1] if u)
+                    html, err, _ = page_pool.fetch(link)
+                    if err == "not_modified":
+                        # Unchanged since it was last stored; nothing to parse or write.
+                        stats["not_modified"] += 1
+                        bs["not_modified"] += 1
+                        unchanged_links.append(link)
+                        continue
                     if err:
                         stats["failed"] += 1
                         bs["failed"] += 1
@@ -135,6 +340,9 @@ def main():
                             blocked_sources.add(source_key)
                             mark_source_blocked(sb, source_key)
                         print(f"Failed: {link} -> {err}", file=sys.stderr)
+                        # Any entry not written keeps the feed validators from advancing,
+                        # so the next run refetches the feed instead of getting a 304.
+                        feed_incomplete = True
                         if err.startswith("blocked:"):
                             break
                         continue
@@ -144,6 +352,7 @@ def main():
                     bs["failed"] += 1
                     bs["last_error"] = f"parse_error:{type(e).__name__}"
                     print(f"Failed: {link} -> {e}", file=sys.stderr)
+                    feed_incomplete = True
                     continue
 
                 try:
@@ -152,94 +361,41 @@ def main():
                     stats["skipped"] += 1
                     bs["skipped"] += 1
                     print(f"Skipped (source not seeded in sources table): {source_key}")
+                    feed_incomplete = True
                     continue
 
                 summary = ""
-                print(f"SUMMARY_GATE do_summary={do_summary} url={link}")
-
-                feed_item = {
-                    "source_id": source_uuid,
-                    "source_type": "article",
-                    "external_id": entry.get("id") or entry.get("guid") or link,
-                    "url": link,
-                    "title": title,
-                    "summary": summary,
-                    "content": content,
-                    "language": "unknown",
-                    "published_at": get_published(entry),
-                    "raw": {"entry": entry, "source": source},
-                }
+                if verbose:
+                    print(f"SUMMARY_GATE do_summary={do_summary} url={link}")
 
-                upsert_feed_item(sb, feed_item)
-                stats["summary_skipped"] += 1
-                bs["summary_skipped"] += 1
-
-                article_id = None
-                try:
-                    article_row = {
-                        "source": source_key,
-                        "title": title,
+                published = get_published(entry)
+                # Hash once at intake; upsert_feed_items and the entity log reuse it.
+                feed_item = prepare_feed_item(
+                    {
+                        "source_id": source_uuid,
+                        "source_type": "article",
+                        "external_id": entry.get("id") or entry.get("guid") or link,
                         "url": link,
-                        "published_at": get_published(entry),
-                        "content": content,
+                        "title": title,
                         "summary": summary,
+                        "content": content,
                         "language": "unknown",
-                        "credibility": None,
-                        "summary_status": "PENDING",
+                        "published_at": published,
+                        "raw": {"entry": entry, "source": source},
                     }
-                    if _article_has_column(sb, "source_id"):
-                        article_row["source_id"] = source_key
-                    if _article_has_column(sb, "source_name"):
-                        article_row["source_name"] = source.get("name") or source_key
-                    sb.table("articles").upsert(article_row, on_conflict="url").execute()
-                    article_id = get_article_id_by_url(sb, link)
-                except Exception as e:
-                    stats["failed"] += 1
-                    bs["failed"] += 1
-                    bs["last_error"] = f"article_upsert_error:{type(e).__name__}"
-                    print(f"Article upsert failed for {link}: {e}")
-                    continue
+                )
 
-                if ollama_ok and should_extract_entities(feed_item):
-                    print(
-                        "ENTITY_HOOK_REACHED",
-                        feed_item.get("external_id"),
-                        feed_item.get("hash"),
-                    )
-                    try:
-                        ents = extract_entities(
-                            title=feed_item.get("title"),
-                            summary=feed_item.get("summary"),
-                            content=feed_item.get("content"),
-                            lang=feed_item.get("language"),
-                        )
-                        if feed_item.get("external_id"):
-                            sb.table("feed_items").update({"entities": ents}).eq(
-                                "external_id", feed_item["external_id"]
-                            ).execute()
-                        else:
-                            sb.table("feed_items").update({"entities": ents}).eq(
-                                "hash", feed_item["hash"]
-                            ).execute()
-                        upsert_entities_for_article(sb, article_id, ents)
-                    except Exception:
-                        err = traceback.format_exc()
-                        print("ENTITY ERROR FULL:\n", err)
-                        marker = {"_entity_error": err[:800]}
-                        stats["llm_failed"] += 1
-                        bs["llm_failed"] += 1
-                        bs["last_error"] = "entity_error"
-                        if feed_item.get("external_id"):
-                            sb.table("feed_items").update({"entities": marker}).eq(
-                                "external_id", feed_item["external_id"]
-                            ).execute()
-                        else:
-                            sb.table("feed_items").update({"entities": marker}).eq(
-                                "hash", feed_item["hash"]
-                            ).execute()
-                stats["saved"] += 1
-                bs["saved"] += 1
-                print(f"Saved: {title}")
+                article_row = {
+                    **article_template,
+                    "title": title,
+                    "url": link,
+                    "published_at": published,
+                    "content": content,
+                    "summary": summary,
+                }
+                pending.append(
+                    {"link": link, "title": title, "feed_item": feed_item, "article_row": article_row}
+                )
                 progress_every = get_int("PROGRESS_EVERY", 5) or 5
                 if progress_every and processed % progress_every == 0:
                     elapsed = int(time.monotonic() - started_ts)
@@ -248,6 +404,28 @@ def main():
                         f"failed={stats['failed']} blocked={stats['blocked']} "
                         f"llm_failed={stats['llm_failed']} elapsed={elapsed}s"
                     )
+            page_pool.close()
+            written = _flush_feed(source_key, pending)
+            if len(written) < len(pending):
+                feed_incomplete = True
+            pending = []
+            kept = unchanged_links + [p["link"] for p in written]
+            page_state[source_key] = {
+                u: page_validators[u]
+                for u in kept
+                if any(page_validators.get(u, {}).values())
+            }
+            page_state_dirty = True
+            if (
+                feed_status == 200
+                and not feed_incomplete
+                and (feed.get("etag") or feed.get("modified"))
+            ):
+                feed_state[source_key] = {
+                    "etag": feed.get("etag"),
+                    "modified": feed.get("modified"),
+                }
+                feed_state_dirty = True
     except KeyboardInterrupt:
         aborted = True
         error_msg = "KeyboardInterrupt"
@@ -257,6 +435,21 @@ def main():
         error_msg = traceback.format_exc()[:8000]
         raise
     finally:
+        if pending and pending_key is not None:
+            # Keep what was already accepted, as the old per-entry writes did.
+            try:
+                _flush_feed(pending_key, pending)
+            except Exception as e:
+                print(f"FEED_FLUSH_FAILED source={pending_key} rows={len(pending)} err={type(e).__name__}")
+        if feed_pool is not None:
+            feed_pool.shutdown(wait=False, cancel_futures=True)
+        if entity_pool is not None:
+            entity_pool.shutdown(wait=False, cancel_futures=True)
+        if feed_state_dirty:
+            save_feed_state(RSS_STATE_PATH, feed_state)
+        if page_state_dirty:
+            save_feed_state(RSS_PAGE_STATE_PATH, page_state)
+        log_entity_cache_stats()
         if not finished:
             if aborted:
                 stats["aborted"] = True
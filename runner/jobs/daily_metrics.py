@@ -1,5 +1,9 @@
 import os
+import re
+import sys
+from collections import Counter, defaultdict
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 
 from backend.db import get_client, get_key_column
 
@@ -7,9 +11,15 @@ from backend.db import get_client, get_key_column
 def _start_of_day(dt: datetime) -> datetime:
     return datetime(dt.year, dt.month, dt.day, tzinfo=timezone.utc)
 
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
+
+
+@lru_cache(maxsize=4096)
 def _normalize_name(val: str | None) -> str:
     if not val:
         return ""
+    if "(" not in val and ")" not in val:
+        return _NON_ALNUM_RE.sub("", val.lower())
     cleaned = []
     depth = 0
     for ch in val:
@@ -22,12 +32,55 @@ def _normalize_name(val: str | None) -> str:
             continue
         if depth == 0:
             cleaned.append(ch)
-    base = "".join(cleaned).strip()
-    return "".join(ch for ch in base.lower() if ch.isalnum())
+    return _NON_ALNUM_RE.sub("", "".join(cleaned).lower())
+
+_ERR_KEYS = (
+    "err_dns",
+    "err_timeout",
+    "err_connect",
+    "err_tls",
+    "err_http_403",
+    "err_http_429",
+    "err_http",
+    "err_other",
+)
+
+
+def _empty_daily_row() -> dict:
+    row = {
+        "saved_new": 0,
+        "failed": 0,
+        "blocked": 0,
+        "junk_saved": 0,
+        "attempted": 0,
+        "total": 0,
+        "dedup_existing": 0,
+        "dedup_new": 0,
+        "updated_existing": 0,
+        "fetch_degraded": False,
+        "discovery_degraded": False,
+    }
+    row.update(dict.fromkeys(_ERR_KEYS, 0))
+    return row
+
+_table_columns_cache: dict[str, set[str]] = {}
+
+
+def _table_columns(sb, table: str) -> set[str]:
+    names = _table_columns_cache.get(table)
+    if names is None:
+        cols = sb.rpc("get_columns", {"p_table": table}).execute().data or []
+        names = {c.get("column_name") for c in cols if c.get("column_name")}
+        _table_columns_cache[table] = names
+    return names
 
 def _has_column(sb, table: str, name: str) -> bool:
-    cols = sb.rpc("get_columns", {"p_table": table}).execute().data or []
-    return name in {c["column_name"] for c in cols}
+    return name in _table_columns(sb, table)
+
+# id(source map) -> (that map, {raw name: key}); holding the map keeps its id from
+# being reused by a different map while the memo is alive.
+_source_key_memo: dict[int, tuple[dict[str, str], dict[str, str | None]]] = {}
+
 
 def _map_source_key(raw_source: str | None, source_name_to_key: dict[str, str]) -> str | None:
     norm = _normalize_name(raw_source)
@@ -36,15 +89,26 @@ def _map_source_key(raw_source: str | None, source_name_to_key: dict[str, str])
     direct = source_name_to_key.get(norm)
     if direct:
         return direct
+    # Substring fallback scans every source; memoize per (map, raw name) since
+    # raw names repeat across rows.
+    entry = _source_key_memo.get(id(source_name_to_key))
+    if entry is None or entry[0] is not source_name_to_key:
+        entry = (source_name_to_key, {})
+        _source_key_memo[id(source_name_to_key)] = entry
+    memo = entry[1]
+    if norm in memo:
+        return memo[norm]
+    found = None
     for name_norm, key in source_name_to_key.items():
         if name_norm and (name_norm in norm or norm in name_norm):
-            return key
-    return None
+            found = key
+            break
+    memo[norm] = found
+    return found
 
 
 def _detect_article_source_mode(sb) -> str | None:
-    cols = sb.rpc("get_columns", {"p_table": "articles"}).execute().data or []
-    names = {c.get("column_name") for c in cols if c.get("column_name")}
+    names = _table_columns(sb, "articles")
     if "source_key" in names:
         return "source_key"
     if "source_id" in names:
@@ -55,8 +119,7 @@ def _detect_article_source_mode(sb) -> str | None:
 
 
 def _detect_article_ts_col(sb) -> str | None:
-    cols = sb.rpc("get_columns", {"p_table": "articles"}).execute().data or []
-    names = {c.get("column_name") for c in cols if c.get("column_name")}
+    names = _table_columns(sb, "articles")
     if "published_at" in names:
         return "published_at"
     if "created_at" in names:
@@ -64,6 +127,26 @@ def _detect_article_ts_col(sb) -> str | None:
     return None
 
 
+ARTICLE_PAGE_SIZE = int(os.getenv("DAILY_METRICS_PAGE_SIZE", "1000"))
+
+
+def _iter_article_rows(sb, columns: str, filters: list[tuple[str, str, str]]):
+    # Keyset pagination on id: bounded responses and no OFFSET scans. Stops on an
+    # empty page rather than a short one, since PostgREST may cap the page size.
+    last_id = None
+    while True:
+        query = sb.table("articles").select(f"id,{columns}")
+        for op, col, val in filters:
+            query = getattr(query, op)(col, val)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(ARTICLE_PAGE_SIZE).execute().data or []
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1]["id"]
+
+
 def _article_counts(
     sb,
     *,
@@ -77,17 +160,26 @@ def _article_counts(
     if not source_col or not ts_col:
         return {}
     since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-    rows = (
-        sb.table("articles")
-        .select(f"{source_col},{ts_col}")
-        .gte(ts_col, since)
-        .execute()
-        .data
-        or []
-    )
+    # Aggregate server-side; fall back to pulling rows if the RPC isn't deployed.
+    try:
+        grouped = (
+            sb.rpc(
+                "article_counts_by_column",
+                {"p_source_col": source_col, "p_ts_col": ts_col, "p_since": since},
+            )
+            .execute()
+            .data
+            or []
+        )
+    except Exception:
+        raw_counts = Counter(
+            row.get(source_col)
+            for row in _iter_article_rows(sb, source_col, [("gte", ts_col, since)])
+        )
+        grouped = [{"raw_key": k, "n": n} for k, n in raw_counts.items()]
     counts: dict[str, int] = {}
-    for row in rows:
-        raw_key = row.get(source_col)
+    for row in grouped:
+        raw_key = row.get("raw_key")
         if not raw_key:
             continue
         if source_col == "source_id":
@@ -100,103 +192,130 @@ def _article_counts(
             key = str(raw_key)
         if not key:
             continue
-        counts[key] = counts.get(key, 0) + 1
+        counts[key] = counts.get(key, 0) + int(row.get("n") or 0)
     return counts
 
 
-def main() -> int:
-    sb = get_client()
-    now = datetime.now(timezone.utc)
-    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    day_start_iso = day_start.isoformat()
-    day_end = day_start + timedelta(days=1)
-    day_end_iso = day_end.isoformat()
-    print(f"DAILY_WINDOW start={day_start_iso} end={day_end_iso}")
-
-    # Aggregate ingest_runs stats for today only (UTC window).
+def _ingest_source_stats(sb, job_name: str, start_iso: str, end_iso: str) -> list[dict]:
+    # One row per (run, source) with only the by_source entry; falls back to
+    # pulling whole stats blobs and flattening them here.
+    params = {"p_job_name": job_name, "p_start": start_iso, "p_end": end_iso}
+    try:
+        return sb.rpc("ingest_source_stats", params).execute().data or []
+    except Exception:
+        pass
     runs = (
         sb.table("ingest_runs")
         .select("stats,started_at,job_name")
-        .gte("started_at", day_start_iso)
-        .lt("started_at", day_end_iso)
-        .eq("job_name", "page_ingest")
+        .gte("started_at", start_iso)
+        .lt("started_at", end_iso)
+        .eq("job_name", job_name)
         .execute()
         .data
         or []
     )
-    daily_by_source: dict[str, dict] = {}
+    out = []
     for r in runs:
         stats = r.get("stats") or {}
         by_source = stats.get("by_source") or {}
         for key, s in by_source.items():
-            saved = int(s.get("saved") or 0)
-            failed = int(s.get("failed") or 0)
-            blocked = int(s.get("blocked") or 0)
-            attempted = s.get("attempted", None)
-            if attempted is None:
-                attempted = s.get("total", None)
-            if attempted is None:
-                attempted = saved + failed + blocked
-            attempted = int(attempted or 0)
-            if attempted > 0 and saved > attempted:
-                print(
-                    f"DAILY_WARN bad_run_detected job=page_ingest source={key} "
-                    f"saved={saved} attempted={attempted} started_at={r.get('started_at')}"
-                )
-                continue
-            row = daily_by_source.setdefault(
-                key,
-                {
-                    "saved_new": 0,
-                    "failed": 0,
-                    "blocked": 0,
-                    "junk_saved": 0,
-                    "attempted": 0,
-                    "total": 0,
-                    "err_dns": 0,
-                    "err_timeout": 0,
-                    "err_connect": 0,
-                    "err_tls": 0,
-                    "err_http_403": 0,
-                    "err_http_429": 0,
-                    "err_http": 0,
-                    "err_other": 0,
-                    "dedup_existing": 0,
-                    "dedup_new": 0,
-                    "updated_existing": 0,
-                    "fetch_degraded": False,
-                    "discovery_degraded": False,
-                },
-            )
-            total = int(s.get("total") or 0)
-
-            dedup_existing = s.get("deduped_existing", None)
-            if dedup_existing is None:
-                dedup_existing = s.get("dedup_existing", 0)
-            dedup_existing = int(dedup_existing or 0)
-
-            row["saved_new"] += saved
-            row["failed"] += failed
-            row["blocked"] += blocked
-            row["total"] += total
-            row["attempted"] += attempted
-            row["dedup_existing"] += dedup_existing
-            row["dedup_new"] += int(s.get("dedup_new") or 0)
-            row["updated_existing"] += int(s.get("updated_existing") or 0)
-            row["junk_saved"] += int(s.get("junk_saved") or 0)
-
-            row["err_dns"] += int(s.get("err_dns", 0))
-            row["err_timeout"] += int(s.get("err_timeout", 0))
-            row["err_connect"] += int(s.get("err_connect", 0))
-            row["err_tls"] += int(s.get("err_tls", 0))
-            row["err_http_403"] += int(s.get("err_http_403", 0))
-            row["err_http_429"] += int(s.get("err_http_429", 0))
-            row["err_http"] += int(s.get("err_http", 0))
-            row["err_other"] += int(s.get("err_other", 0))
-            row["fetch_degraded"] = row["fetch_degraded"] or bool(s.get("fetch_degraded"))
-            row["discovery_degraded"] = row["discovery_degraded"] or bool(
-                s.get("discovery_degraded")
+            out.append({"started_at": r.get("started_at"), "source_key": key, "stats": s})
+    return out
+
+
+def _collapse_status(status: str | None) -> str:
+    if status == "DONE_FASTPATH":
+        return "DONE"
+    return status or "UNKNOWN"
+
+
+def _summary_status_rows(
+    sb, source_col: str, start_iso: str | None = None, end_iso: str | None = None
+) -> list[dict]:
+    # (raw_key, status, n) grouped in Postgres; falls back to grouping pulled rows.
+    params = {"p_source_col": source_col, "p_start": start_iso, "p_end": end_iso}
+    try:
+        return sb.rpc("summary_status_counts", params).execute().data or []
+    except Exception:
+        pass
+    filters = []
+    if start_iso:
+        filters.append(("gte", "summary_updated_at", start_iso))
+    if end_iso:
+        filters.append(("lt", "summary_updated_at", end_iso))
+    grouped = Counter(
+        (row.get(source_col), _collapse_status(row.get("summary_status")))
+        for row in _iter_article_rows(sb, f"{source_col},summary_status", filters)
+    )
+    return [{"raw_key": k, "status": status, "n": n} for (k, status), n in grouped.items()]
+
+
+def _prune_entity_cache(sb) -> None:
+    # entity_cache is only ever appended to by the ingest jobs; this daily job trims it.
+    days = int(os.getenv("ENTITY_CACHE_MAX_AGE_DAYS", "30") or 30)
+    try:
+        n = sb.rpc("prune_entity_cache", {"p_max_age": f"{days} days"}).execute().data
+    except Exception as e:
+        print(f"DAILY_ENTITY_CACHE_PRUNE_FAIL err={type(e).__name__}")
+        return
+    print(f"DAILY_ENTITY_CACHE_PRUNED rows={n or 0} max_age_days={days}")
+
+
+def main() -> int:
+    sb = get_client()
+    now = datetime.now(timezone.utc)
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_start_iso = day_start.isoformat()
+    day_end = day_start + timedelta(days=1)
+    day_end_iso = day_end.isoformat()
+    print(f"DAILY_WINDOW start={day_start_iso} end={day_end_iso}")
+
+    # Aggregate ingest_runs stats for today only (UTC window).
+    run_rows = _ingest_source_stats(sb, "page_ingest", day_start_iso, day_end_iso)
+    daily_by_source: defaultdict[str, dict] = defaultdict(_empty_daily_row)
+    for r in run_rows:
+        key = r.get("source_key")
+        s = r.get("stats") or {}
+        get = s.get
+        saved = int(get("saved") or 0)
+        failed = int(get("failed") or 0)
+        blocked = int(get("blocked") or 0)
+        attempted = get("attempted", None)
+        if attempted is None:
+            attempted = get("total", None)
+        if attempted is None:
+            attempted = saved + failed + blocked
+        attempted = int(attempted or 0)
+        if attempted > 0 and saved > attempted:
+            print(
+                f"DAILY_WARN bad_run_detected job=page_ingest source={key} "
+                f"saved={saved} attempted={attempted} started_at={r.get('started_at')}"
             )
+            continue
+        row = daily_by_source[key]
+        total = int(get("total") or 0)
+
+        dedup_existing = get("deduped_existing", None)
+        if dedup_existing is None:
+            dedup_existing = get("dedup_existing", 0)
+        dedup_existing = int(dedup_existing or 0)
+
+        row["saved_new"] += saved
+        row["failed"] += failed
+        row["blocked"] += blocked
+        row["total"] += total
+        row["attempted"] += attempted
+        row["dedup_existing"] += dedup_existing
+        row["dedup_new"] += int(get("dedup_new") or 0)
+        row["updated_existing"] += int(get("updated_existing") or 0)
+        row["junk_saved"] += int(get("junk_saved") or 0)
+
+        for err_key in _ERR_KEYS:
+            row[err_key] += int(get(err_key, 0))
+        row["fetch_degraded"] = row["fetch_degraded"] or bool(get("fetch_degraded"))
+        row["discovery_degraded"] = row["discovery_degraded"] or bool(
+            get("discovery_degraded")
+        )
 
     # Map source_id -> source key for consistent reporting.
     key_col = get_key_column(sb)
@@ -212,74 +331,32 @@ def main() -> int:
     source_key_set = {row.get(key_col) for row in sources if row.get(key_col)}
 
     # Summary state (no date filter). These do NOT affect DAILY_METRICS.
-    if has_source_id:
-        summary_counts = (
-            sb.table("articles").select("source_id,summary_status").execute().data or []
-        )
-    else:
-        summary_counts = (
-            sb.table("articles").select("source,summary_status").execute().data or []
-        )
-    summary_by_source = {}
-    for row in summary_counts:
-        if has_source_id:
-            sid = row.get("source_id")
-            key = source_id_to_key.get(sid) if sid else None
-            if not key:
-                key = "unknown"
-        else:
-            raw_source = row.get("source")
-            key = _map_source_key(raw_source, source_name_to_key) or (
-                raw_source if raw_source in source_key_set else None
-            )
-            if not key:
-                key = row.get("source") or "unknown"
-        status = row.get("summary_status") or "UNKNOWN"
-        if status == "DONE_FASTPATH":
-            status = "DONE"
-        bucket = summary_by_source.setdefault(key, {})
-        bucket[status] = bucket.get(status, 0) + 1
+    source_col = "source_id" if has_source_id else "source"
+
+    def _summary_buckets(rows: list[dict]) -> dict[str, dict[str, int]]:
+        out: dict[str, dict[str, int]] = {}
+        for row in rows:
+            raw_key = row.get("raw_key")
+            if has_source_id:
+                key = source_id_to_key.get(raw_key) if raw_key else None
+                if not key:
+                    key = "unknown"
+            else:
+                key = _map_source_key(raw_key, source_name_to_key) or (
+                    raw_key if raw_key in source_key_set else None
+                )
+                if not key:
+                    key = raw_key or "unknown"
+            bucket = out.setdefault(key, {})
+            bucket[row["status"]] = bucket.get(row["status"], 0) + int(row.get("n") or 0)
+        return out
+
+    summary_by_source = _summary_buckets(_summary_status_rows(sb, source_col))
 
     # Summary completed today (optional, date filter).
-    if has_source_id:
-        summary_today = (
-            sb.table("articles")
-            .select("source_id,summary_status,summary_updated_at")
-            .gte("summary_updated_at", day_start_iso)
-            .lt("summary_updated_at", day_end_iso)
-            .execute()
-            .data
-            or []
-        )
-    else:
-        summary_today = (
-            sb.table("articles")
-            .select("source,summary_status,summary_updated_at")
-            .gte("summary_updated_at", day_start_iso)
-            .lt("summary_updated_at", day_end_iso)
-            .execute()
-            .data
-            or []
-        )
-    summary_today_by_source = {}
-    for row in summary_today:
-        if has_source_id:
-            sid = row.get("source_id")
-            key = source_id_to_key.get(sid) if sid else None
-            if not key:
-                key = "unknown"
-        else:
-            raw_source = row.get("source")
-            key = _map_source_key(raw_source, source_name_to_key) or (
-                raw_source if raw_source in source_key_set else None
-            )
-            if not key:
-                key = row.get("source") or "unknown"
-        status = row.get("summary_status") or "UNKNOWN"
-        if status == "DONE_FASTPATH":
-            status = "DONE"
-        bucket = summary_today_by_source.setdefault(key, {})
-        bucket[status] = bucket.get(status, 0) + 1
+    summary_today_by_source = _summary_buckets(
+        _summary_status_rows(sb, source_col, day_start_iso, day_end_iso)
+    )
 
     counts_7d = _article_counts(
         sb,
@@ -301,6 +378,9 @@ def main() -> int:
     print(f"DAILY_SOURCES_TOP5 sources={top5_str}")
     print(f"DAILY_SOURCES_ACTIVE_48H count={sources_active_48h}")
 
+    # Per-source lines are collected and written once instead of printed one by one.
+    out_lines: list[str] = []
+    emit = out_lines.append
     for key, s in daily_by_source.items():
         attempted = s["attempted"]
         fetch_degraded = s["fetch_degraded"]
@@ -318,7 +398,7 @@ def main() -> int:
             block_rate_str = f"{(s['blocked'] / attempted):.3f}"
             kept_ratio_str = f"{(saved_new / attempted):.3f}"
 
-        print(
+        emit(
             f"DAILY_METRICS source={key} "
             f"saved_new={saved_new} updated_existing={updated_existing} "
             f"failed={s['failed']} blocked={s['blocked']} "
@@ -327,27 +407,15 @@ def main() -> int:
             f"dedup_existing={s['dedup_existing']} dedup_new={s['dedup_new']} "
             f"discovery_degraded={int(s['discovery_degraded'])} fetch_degraded={int(fetch_degraded)}"
         )
-        if any(
-            s.get(k, 0)
-            for k in (
-                "err_dns",
-                "err_timeout",
-                "err_connect",
-                "err_tls",
-                "err_http_403",
-                "err_http_429",
-                "err_http",
-                "err_other",
-            )
-        ):
-            print(
+        if any(s.get(k, 0) for k in _ERR_KEYS):
+            emit(
                 f"DAILY_ERRORS source={key} dns={s['err_dns']} timeout={s['err_timeout']} "
                 f"connect={s['err_connect']} tls={s['err_tls']} http_403={s['err_http_403']} "
                 f"http_429={s['err_http_429']} http_other={s['err_http']} other={s['err_other']}"
             )
         if attempted > 0:
             http_err = s["err_http_403"] + s["err_http_429"] + s["err_http"]
-            print(
+            emit(
                 f"DAILY_ERROR_RATES source={key} dns_rate={(s['err_dns']/attempted):.3f} "
                 f"timeout_rate={(s['err_timeout']/attempted):.3f} "
                 f"http_rate={(http_err/attempted):.3f}"
@@ -357,16 +425,21 @@ def main() -> int:
             pending = summary_by_source[key].get("PENDING", 0)
             timeout = summary_by_source[key].get("TIMEOUT", 0)
             error = summary_by_source[key].get("ERROR", 0)
-            print(
+            emit(
                 f"DAILY_SUMMARY_STATE source={key} done={done} pending={pending} "
                 f"timeout={timeout} error={error}"
             )
         if key in summary_today_by_source:
             done_today = summary_today_by_source[key].get("DONE", 0)
-            print(
+            emit(
                 f"DAILY_SUMMARY_TODAY source={key} done_today={done_today}"
             )
 
+    if out_lines:
+        sys.stdout.write("\n".join(out_lines) + "\n")
+        sys.stdout.flush()
+
+    _prune_entity_cache(sb)
     return 0
 
 
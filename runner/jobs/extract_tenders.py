@@ -1,16 +1,27 @@
 import json
 import argparse
+import hashlib
 import os
 import re
 import subprocess
 import tempfile
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import wraps
 from html import unescape
 from pathlib import Path
 from urllib.parse import urljoin
 
+import httpx
 import psycopg2
-import requests
+from psycopg2.extras import execute_values
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 
 CONFIG_PATH = Path(__file__).resolve().parents[1] / "ingest" / "procurement_sources.json"
@@ -21,38 +32,136 @@ DEADLINE_PATTERNS = [
 ]
 
 SECTOR_KEYWORDS = {
-    "oil": ["rig", "pipeline", "well", "drilling", "compressor", "refinery"],
-    "utilities": ["generator", "transformer", "substation", "grid", "switchgear"],
-    "ports": ["port", "terminal", "berth", "dredging"],
-    "telecom": ["fiber", "tower", "core network", "radio", "telecom"],
+    "oil": ("rig", "pipeline", "well", "drilling", "compressor", "refinery"),
+    "utilities": ("generator", "transformer", "substation", "grid", "switchgear"),
+    "ports": ("port", "terminal", "berth", "dredging"),
+    "telecom": ("fiber", "tower", "core network", "radio", "telecom"),
 }
 
-AR_KEYWORDS = [
+# Most frequent hits first so the any() fallback short-circuits early;
+# "لجنة العطاءات" already contains "عطاء" and is kept last for readability.
+AR_KEYWORDS = (
+    "إعلان",
     "مناقصة",
     "عطاء",
     "توريد",
+    "تقديم العروض",
     "تأهيل",
+    "كراسة الشروط",
     "إبداء الاهتمام",
-    "إعلان",
     "لجنة العطاءات",
-    "كراسة الشروط",
-    "تقديم العروض",
-]
+)
 
-AR_CORE_KEYWORDS = [
+AR_CORE_KEYWORDS = (
     "مناقصة",
     "عطاء",
     "توريد",
+    "تقديم العروض",
     "تأهيل",
+    "كراسة الشروط",
     "إبداء الاهتمام",
     "لجنة العطاءات",
-    "كراسة الشروط",
-    "تقديم العروض",
-]
+)
+
+FETCH_CONCURRENCY = int(os.getenv("EXTRACT_TENDERS_CONCURRENCY", "8")) or 1
+CONVERT_TIMEOUT = int(os.getenv("EXTRACT_TENDERS_CONVERT_TIMEOUT", "30"))
+PDF_MAX_PAGES = int(os.getenv("EXTRACT_TENDERS_PDF_MAX_PAGES", "50"))
+# Only this much text is ever stored (tenders.pdf_text), so nothing past it is scanned.
+TEXT_MAX_CHARS = 200000
+
+
+# One translate pass for matching: Arabic-Indic digits to ASCII, tatweel dropped,
+# alef/hamza variants, ta marbuta and alef maqsura folded. Keywords and deadline
+# patterns are folded the same way, so spelling variants in the source still match.
+_AR_NORM_TABLE = str.maketrans(
+    {
+        **{ord(a): d for a, d in zip("٠١٢٣٤٥٦٧٨٩", "0123456789")},
+        **{ord(a): d for a, d in zip("۰۱۲۳۴۵۶۷۸۹", "0123456789")},
+        0x0640: None,
+        0x0623: "ا",
+        0x0625: "ا",
+        0x0622: "ا",
+        0x0629: "ه",
+        0x0649: "ي",
+    }
+)
+
+
+def normalize_ar(text: str) -> str:
+    # NFKC first folds the presentation forms pdftotext often emits.
+    return unicodedata.normalize("NFKC", text).translate(_AR_NORM_TABLE)
+
+
+_AR_KEYWORDS_NORM = tuple(normalize_ar(k) for k in AR_KEYWORDS)
+_AR_CORE_KEYWORDS_NORM = tuple(normalize_ar(k) for k in AR_CORE_KEYWORDS)
+
+
+def _automaton(words):
+    # One Aho-Corasick pass per text instead of a substring scan per keyword.
+    if ahocorasick is None:
+        return None
+    ac = ahocorasick.Automaton()
+    for w in words:
+        ac.add_word(w, w)
+    ac.make_automaton()
+    return ac
+
+
+_AR_AC = _automaton(_AR_KEYWORDS_NORM)
+_AR_CORE_AC = _automaton(_AR_CORE_KEYWORDS_NORM)
+_SECTOR_BY_KEYWORD = {kw: sector for sector, kws in SECTOR_KEYWORDS.items() for kw in kws}
+_SECTOR_AC = _automaton(_SECTOR_BY_KEYWORD)
+
+
+def _has_any(ac, words: tuple[str, ...], text: str) -> bool:
+    if ac is None:
+        return any(k in text for k in words)
+    return next(ac.iter(text), None) is not None
+
 
 ATTACH_RE = re.compile(r'href="([^"]+\.(?:pdf|docx?|jpg|jpeg|png))"', re.I)
+# Kept as separate patterns tried in order: the first pattern that matches anywhere
+# wins, which a single alternation (earliest match of either) would not preserve.
+DEADLINE_RES = [re.compile(normalize_ar(p), re.I) for p in DEADLINE_PATTERNS]
+# Script/style blocks and plain tags in one pass; the block alternative is tried
+# first at each "<", so an unterminated <script> still falls back to a tag strip.
+MARKUP_RE = re.compile(r"<(script|style)[^>]*>.*?</\1>|<[^>]+>", re.S | re.I)
+WS_RE = re.compile(r"\s+")
+ITEM_PAGE_RE = re.compile(r'<div class="item-page"[^>]*>', re.I)
+ITEM_END_RE = re.compile(
+    r'<div class="bt-social-share"|<ul class="pagenav"|<div class="ja-moduletable'
+)
+TITLE_RE = re.compile(r'<h2 class="contentheading">\s*<a[^>]*>(.*?)</a>', re.S | re.I)
+ARTICLE_DATE_RE = re.compile(
+    r'<div class="article-date">\s*([0-9]{1,2}/[0-9]{1,2}\s+[0-9]{4})', re.S | re.I
+)
+URL_DATE_RE = re.compile(r'/(\d{4}-\d{2}-\d{2})')
 
 _OPENAI_CLIENT = None
+_HTTP_CLIENT = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+
+def _http() -> httpx.Client:
+    # One keep-alive client for detail pages and attachments (same few hosts), shared
+    # by the lpma workers; HTTP/2 when the h2 package is installed.
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            limits = httpx.Limits(max_keepalive_connections=20)
+            try:
+                _HTTP_CLIENT = httpx.Client(http2=True, follow_redirects=True, limits=limits)
+            except ImportError:
+                _HTTP_CLIENT = httpx.Client(follow_redirects=True, limits=limits)
+        return _HTTP_CLIENT
+
+
+def _close_http() -> None:
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is not None:
+            _HTTP_CLIENT.close()
+            _HTTP_CLIENT = None
 
 
 def _get_openai_client():
@@ -125,86 +234,107 @@ def _parse_date(val: str | None):
     return None
 
 
-_ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+def _memo_on_text(fn):
+    # Pure text -> result helpers; keyed on a digest so large attachment texts
+    # aren't kept alive by the cache. Near-duplicate postings hit often.
+    cache: dict[bytes, object] = {}
 
+    @wraps(fn)
+    def wrapper(text):
+        if not text:
+            return fn(text)
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        if key not in cache:
+            if len(cache) >= 4096:
+                cache.clear()
+            cache[key] = fn(text)
+        return cache[key]
 
-def _normalize_digits(text: str) -> str:
-    return text.translate(_ARABIC_DIGITS)
+    return wrapper
 
 
+@_memo_on_text
 def extract_deadline(text: str | None):
+    # Expects normalize_ar output; callers normalize each row's text once.
     if not text:
         return None
-    text = _normalize_digits(text)
-    for p in DEADLINE_PATTERNS:
-        m = re.search(p, text, re.I)
+    for p in DEADLINE_RES:
+        m = p.search(text)
         if m:
             return _parse_date(m.group(2))
     return None
 
 
+# The keyword matchers also take normalize_ar output.
 def contains_keywords(text: str) -> bool:
-    return any(k in text for k in AR_KEYWORDS)
+    return _has_any(_AR_AC, _AR_KEYWORDS_NORM, text)
 
 
 def contains_core_keywords(text: str) -> bool:
-    return any(k in text for k in AR_CORE_KEYWORDS)
+    return _has_any(_AR_CORE_AC, _AR_CORE_KEYWORDS_NORM, text)
 
 
 def html_to_text(html: str) -> str:
     if not html:
         return ""
-    html = re.sub(r"<(script|style)[^>]*>.*?</\1>", " ", html, flags=re.S | re.I)
-    html = re.sub(r"<[^>]+>", " ", html)
+    html = MARKUP_RE.sub(" ", html)
+    # Whitespace collapses after unescape so entities like &nbsp; are folded too.
     html = unescape(html)
-    html = re.sub(r"\s+", " ", html)
+    html = WS_RE.sub(" ", html)
     return html.strip()
 
 
 def extract_item_html(html: str) -> str:
     if not html:
         return ""
-    m = re.search(r'<div class="item-page"[^>]*>(.*)', html, re.S | re.I)
+    m = ITEM_PAGE_RE.search(html)
     if not m:
         return ""
-    tail = m.group(1)
-    for marker in (
-        '<div class="bt-social-share"',
-        '<ul class="pagenav"',
-        '<div class="ja-moduletable',
-    ):
-        idx = tail.find(marker)
-        if idx != -1:
-            tail = tail[:idx]
-            break
-    return tail
+    # One scan from the opening tag to the first end marker; only the slice is copied.
+    end = ITEM_END_RE.search(html, m.end())
+    return html[m.end() : end.start() if end else len(html)]
 
 
 def extract_pdf_text(url: str) -> str:
     try:
-        r = requests.get(url, timeout=20)
+        r = _http().get(url, timeout=20)
         if r.status_code != 200:
             return ""
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-            f.write(r.content)
-            tmp = f.name
-        txt_path = tmp + ".txt"
-        subprocess.run(
-            ["pdftotext", "-layout", tmp, txt_path],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            check=False,
-        )
-        text = Path(txt_path).read_text(errors="ignore")
-        Path(tmp).unlink(missing_ok=True)
-        Path(txt_path).unlink(missing_ok=True)
-        return text
+        return _pdftotext(r.content)
     except Exception:
         return ""
 
 
+def _pdftotext(pdf_bytes: bytes) -> str:
+    # Pipe the PDF through stdin/stdout. Older poppler builds can't open "-"; only
+    # that failure falls back to a temp file (removed even on errors). Corrupt or
+    # encrypted PDFs fail the same way from a file, so they are not converted twice.
+    out = subprocess.run(
+        ["pdftotext", "-layout", "-l", str(PDF_MAX_PAGES), "-", "-"],
+        input=pdf_bytes,
+        capture_output=True,
+        check=False,
+        timeout=CONVERT_TIMEOUT,
+    )
+    stdin_unsupported = (
+        out.returncode != 0 and not out.stdout and b"Couldn't open file" in out.stderr
+    )
+    if not stdin_unsupported:
+        return out.stdout.decode("utf-8", errors="ignore")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = Path(tmp_dir) / "in.pdf"
+        pdf_path.write_bytes(pdf_bytes)
+        out = subprocess.run(
+            ["pdftotext", "-layout", "-l", str(PDF_MAX_PAGES), str(pdf_path), "-"],
+            capture_output=True,
+            check=False,
+            timeout=CONVERT_TIMEOUT,
+        )
+    return out.stdout.decode("utf-8", errors="ignore")
+
+
 def fetch_bytes(url: str, timeout: int = 25) -> bytes:
-    r = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
+    r = _http().get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
     if r.status_code != 200:
         return b""
     return r.content
@@ -212,36 +342,23 @@ def fetch_bytes(url: str, timeout: int = 25) -> bytes:
 
 def extract_pdf_text_bytes(pdf_bytes: bytes) -> str:
     try:
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-            f.write(pdf_bytes)
-            pdf_path = f.name
-        txt_path = pdf_path + ".txt"
-        subprocess.run(
-            ["pdftotext", "-layout", pdf_path, txt_path],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            check=False,
-        )
-        text = Path(txt_path).read_text(errors="ignore")
-        Path(pdf_path).unlink(missing_ok=True)
-        Path(txt_path).unlink(missing_ok=True)
-        return text.strip()
+        return _pdftotext(pdf_bytes).strip()
     except Exception:
         return ""
 
 
 def extract_doc_text_bytes(doc_bytes: bytes) -> str:
     try:
-        with tempfile.NamedTemporaryFile(suffix=".doc", delete=False) as f:
-            f.write(doc_bytes)
-            doc_path = f.name
-        out = subprocess.run(
-            ["antiword", doc_path],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        Path(doc_path).unlink(missing_ok=True)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_path = Path(tmp_dir) / "in.doc"
+            doc_path.write_bytes(doc_bytes)
+            out = subprocess.run(
+                ["antiword", str(doc_path)],
+                capture_output=True,
+                text=True,
+                check=False,
+                timeout=CONVERT_TIMEOUT,
+            )
         return (out.stdout or "").strip()
     except Exception:
         return ""
@@ -250,28 +367,128 @@ def extract_doc_text_bytes(doc_bytes: bytes) -> str:
 def extract_docx_text_bytes(docx_bytes: bytes) -> str:
     try:
         import docx2txt
-        with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as f:
-            f.write(docx_bytes)
-            docx_path = f.name
-        text = docx2txt.process(docx_path) or ""
-        Path(docx_path).unlink(missing_ok=True)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docx_path = Path(tmp_dir) / "in.docx"
+            docx_path.write_bytes(docx_bytes)
+            text = docx2txt.process(str(docx_path)) or ""
         return text.strip()
     except Exception:
         return ""
 
 
-def extract_attachment_text(url: str) -> str:
+class AttachmentCache:
+    # url -> validators, content hash and extracted text in tender_attachments_cache.
+    # Shared by the lpma workers, so access to the connection is serialized.
+
+    def __init__(self, db_url: str):
+        self._lock = threading.RLock()
+        self._conn = None
+        try:
+            self._conn = psycopg2.connect(db_url)
+            self._conn.autocommit = True
+        except Exception as e:
+            print(f"ATTACH_CACHE_DISABLED err={type(e).__name__}")
+
+    def get(self, url: str) -> dict | None:
+        if self._conn is None:
+            return None
+        with self._lock:
+            try:
+                with self._conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        SELECT etag, last_modified, content_hash, extracted_text
+                        FROM tender_attachments_cache WHERE url = %s
+                        """,
+                        (url,),
+                    )
+                    row = cur.fetchone()
+            except Exception as e:
+                print(f"ATTACH_CACHE_DISABLED err={type(e).__name__}")
+                self.close()
+                return None
+        if not row:
+            return None
+        return {"etag": row[0], "modified": row[1], "hash": row[2], "text": row[3] or ""}
+
+    def put(self, url: str, etag, modified, content_hash: str, text: str) -> None:
+        if self._conn is None:
+            return
+        with self._lock:
+            try:
+                with self._conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO tender_attachments_cache
+                            (url, etag, last_modified, content_hash, extracted_text, fetched_at)
+                        VALUES (%s,%s,%s,%s,%s,now())
+                        ON CONFLICT (url) DO UPDATE SET
+                            etag = EXCLUDED.etag,
+                            last_modified = EXCLUDED.last_modified,
+                            content_hash = EXCLUDED.content_hash,
+                            extracted_text = EXCLUDED.extracted_text,
+                            fetched_at = EXCLUDED.fetched_at
+                        """,
+                        (url, etag, modified, content_hash, text),
+                    )
+            except Exception as e:
+                print(f"ATTACH_CACHE_WRITE_FAILED url={url} err={type(e).__name__}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+
+
+def _convert_attachment(url: str, b: bytes) -> str:
     lower = url.lower()
-    b = fetch_bytes(url)
-    if not b:
-        return ""
     if lower.endswith(".pdf"):
-        return extract_pdf_text_bytes(b)
-    if lower.endswith(".doc"):
-        return extract_doc_text_bytes(b)
-    if lower.endswith(".docx"):
-        return extract_docx_text_bytes(b)
-    return ""
+        text = extract_pdf_text_bytes(b)
+    elif lower.endswith(".doc"):
+        text = extract_doc_text_bytes(b)
+    elif lower.endswith(".docx"):
+        text = extract_docx_text_bytes(b)
+    else:
+        return ""
+    return text[:TEXT_MAX_CHARS]
+
+
+def extract_attachment_text(url: str, cache: AttachmentCache | None = None) -> str:
+    if cache is None:
+        b = fetch_bytes(url)
+        return _convert_attachment(url, b) if b else ""
+
+    # Conditional GET against the cached validators: unchanged attachments reuse
+    # the stored text, and a changed response with identical bytes skips conversion.
+    cached = cache.get(url) or {}
+    is_document = url.lower().endswith((".pdf", ".doc", ".docx"))
+    if is_document and not cached.get("text"):
+        # Never trust an empty document conversion; convert it again.
+        cached = {}
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("modified"):
+        headers["If-Modified-Since"] = cached["modified"]
+    r = _http().get(url, timeout=25, headers=headers)
+    if r.status_code == 304 and cached:
+        return cached["text"]
+    if r.status_code != 200 or not r.content:
+        return ""
+    content_hash = hashlib.sha256(r.content).hexdigest()
+    if cached and content_hash == cached["hash"]:
+        text = cached["text"]
+    else:
+        text = _convert_attachment(url, r.content)
+    if is_document and not text:
+        # Timeouts, converter crashes or a missing converter: retry on the next run.
+        return ""
+    cache.put(url, r.headers.get("etag"), r.headers.get("last-modified"), content_hash, text)
+    return text
 
 
 def find_attachment_links(base_url: str, html: str) -> list[str]:
@@ -288,10 +505,88 @@ def find_attachment_links(base_url: str, html: str) -> list[str]:
     return out
 
 
+def _count_attachment_links(base_url: str, html: str) -> int:
+    # Same count as len(find_attachment_links(...)), without building the list.
+    return len({urljoin(base_url, m.group(1)) for m in ATTACH_RE.finditer(html or "")})
+
+
+def _row_date(published_at):
+    if not published_at:
+        return None
+    try:
+        return published_at.date()
+    except Exception:
+        return None
+
+
+def process_lpma_row(
+    url: str, text: str, publish_date, cache: AttachmentCache | None = None
+) -> dict:
+    # Network and parsing for one lpma_tenders row; safe to run on a worker thread.
+    detail_html = ""
+    try:
+        detail_html = _http().get(url, timeout=20).text
+    except Exception:
+        detail_html = ""
+    item_html = extract_item_html(detail_html) or detail_html
+    detail_text = html_to_text(item_html) if item_html else ""
+    if not detail_text:
+        detail_text = text
+    title = None
+    title_match = TITLE_RE.search(detail_html)
+    if title_match:
+        title = html_to_text(title_match.group(1))[:200] or None
+    date_match = ARTICLE_DATE_RE.search(detail_html)
+    if date_match:
+        publish_date = _parse_date(date_match.group(1))
+    if publish_date is None:
+        url_date = URL_DATE_RE.search(url)
+        if url_date:
+            publish_date = _parse_date(url_date.group(1))
+    detail_norm = normalize_ar(detail_text)
+    attachment_text = ""
+    attachment_norm = ""
+    gate = "fail"
+    if contains_core_keywords(detail_norm):
+        # Gated on the page itself: attachments are only counted, never fetched.
+        gate = "html"
+        attachments_count = _count_attachment_links(url, item_html)
+    else:
+        attachments = find_attachment_links(url, item_html)
+        attachments_count = len(attachments)
+        for aurl in attachments:
+            t = extract_attachment_text(aurl, cache)
+            if not t:
+                continue
+            t_norm = normalize_ar(t)
+            if contains_core_keywords(t_norm):
+                attachment_text = t
+                attachment_norm = t_norm
+                gate = "attach"
+                break
+    return {
+        "fetch_ok": bool(detail_html),
+        "gate": gate,
+        "title": title,
+        "publish_date": publish_date,
+        "text": (attachment_text or detail_text)[:TEXT_MAX_CHARS],
+        "text_norm": (attachment_norm or detail_norm)[:TEXT_MAX_CHARS],
+        "attachments_count": attachments_count,
+    }
+
+
+@_memo_on_text
 def classify_sector(text: str | None):
     if not text:
         return "unknown"
     t = text.lower()
+    if _SECTOR_AC is not None:
+        # Sectors keep their declared priority, not the order matches appear in.
+        hits = {_SECTOR_BY_KEYWORD[kw] for _, kw in _SECTOR_AC.iter(t)}
+        for sector in SECTOR_KEYWORDS:
+            if sector in hits:
+                return sector
+        return "unknown"
     for sector, kws in SECTOR_KEYWORDS.items():
         if any(k in t for k in kws):
             return sector
@@ -327,7 +622,11 @@ def run(db_url: str, source_filter: str | None = None):
         FROM feed_items
         WHERE raw ? 'procurement'
           AND (%s IS NULL OR raw->'procurement'->>'source_key' = %s)
-          AND id NOT IN (SELECT raw_article_id FROM tenders WHERE raw_article_id IS NOT NULL)
+          AND (
+            raw->'procurement'->>'source_key' = 'lpma_tenders'
+            OR coalesce(nullif(content, ''), nullif(summary, '')) IS NOT NULL
+          )
+          AND NOT EXISTS (SELECT 1 FROM tenders t WHERE t.raw_article_id = feed_items.id)
         ORDER BY ingested_at DESC
         LIMIT 500
         """,
@@ -335,119 +634,108 @@ def run(db_url: str, source_filter: str | None = None):
     )
     rows = cur.fetchall()
 
+    # lpma detail pages and attachments are fetched on a pool; rows are still
+    # gated and written here in query order.
+    pool = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY)
+    attach_cache = AttachmentCache(db_url)
+    lpma_results = {}
     for rid, source_key, url, content, summary, published_at, language in rows:
-        c_candidates += 1
-        text = content or summary or ""
-        text = text or ""
-        title = None
-        publish_date = None
-        if published_at:
-            try:
-                publish_date = published_at.date()
-            except Exception:
-                publish_date = None
-
         if source_key == "lpma_tenders":
-            detail_html = ""
-            try:
-                detail_html = requests.get(url, timeout=20).text
-            except Exception:
-                detail_html = ""
-            if detail_html:
-                c_fetch_ok += 1
-            item_html = extract_item_html(detail_html) or detail_html
-            detail_text = html_to_text(item_html) if item_html else ""
-            if not detail_text:
-                detail_text = text
-            title_match = re.search(
-                r'<h2 class="contentheading">\s*<a[^>]*>(.*?)</a>',
-                detail_html,
-                re.S | re.I,
+            lpma_results[rid] = pool.submit(
+                process_lpma_row,
+                url,
+                content or summary or "",
+                _row_date(published_at),
+                attach_cache,
             )
-            if title_match:
-                title = html_to_text(title_match.group(1))[:200] or title
-            date_match = re.search(
-                r'<div class="article-date">\s*([0-9]{1,2}/[0-9]{1,2}\s+[0-9]{4})',
-                detail_html,
-                re.S | re.I,
+
+    insert_rows: list[tuple] = []
+    try:
+        for rid, source_key, url, content, summary, published_at, language in rows:
+            c_candidates += 1
+            text = (content or summary or "")[:TEXT_MAX_CHARS]
+            title = None
+            publish_date = _row_date(published_at)
+
+            if source_key == "lpma_tenders":
+                res = lpma_results[rid].result()
+                if res["fetch_ok"]:
+                    c_fetch_ok += 1
+                if res["gate"] == "html":
+                    c_gate_html += 1
+                elif res["gate"] == "attach":
+                    c_gate_attach += 1
+                else:
+                    c_gate_fail += 1
+                    continue
+                title = res["title"] or title
+                publish_date = res["publish_date"]
+                text = res["text"]
+                text_norm = res["text_norm"]
+                attachments_count = res["attachments_count"]
+            else:
+                if not text:
+                    continue
+                text_norm = normalize_ar(text)
+                attachments_count = 0
+
+            if not title:
+                title = text.split("\n")[0][:200]
+            src_meta = meta.get(source_key or "") or {}
+            buyer = src_meta.get("buyer") or (source_key or "unknown")
+            sector = src_meta.get("sector") or classify_sector(text)
+            deadline = extract_deadline(text_norm)
+            summary_text = summarize(text)
+            title_en = translate_to_english(title)
+            summary_en = None
+            confidence = 0.2
+            if deadline:
+                confidence += 0.4
+            if sector and sector != "unknown":
+                confidence += 0.2
+
+            insert_rows.append(
+                (
+                    source_key or "unknown",
+                    buyer,
+                    title,
+                    summary_text,
+                    title_en,
+                    summary_en,
+                    publish_date,
+                    deadline,
+                    sector,
+                    url,
+                    rid,
+                    language,
+                    confidence,
+                    text,
+                    attachments_count,
+                )
             )
-            if date_match:
-                publish_date = _parse_date(date_match.group(1))
-            if publish_date is None:
-                url_date = re.search(r'/(\d{4}-\d{2}-\d{2})', url)
-                if url_date:
-                    publish_date = _parse_date(url_date.group(1))
-            passed = contains_core_keywords(detail_text)
-            attachment_text = ""
-            attachments = find_attachment_links(url, item_html)
-
-            if passed:
-                c_gate_html += 1
-            elif attachments:
-                for aurl in attachments:
-                    t = extract_attachment_text(aurl)
-                    if t and contains_core_keywords(t):
-                        attachment_text = t
-                        passed = True
-                        c_gate_attach += 1
-                        break
-
-            if not passed:
-                c_gate_fail += 1
-                continue
 
-            best_text = attachment_text if attachment_text else detail_text
-            text = best_text
-            attachments_count = len(attachments)
-        else:
-            if not text:
-                continue
-            attachments_count = 0
-
-        if not title:
-            title = text.split("\n")[0][:200]
-        buyer = meta.get(source_key or "", {}).get("buyer") or (source_key or "unknown")
-        sector = meta.get(source_key or "", {}).get("sector") or classify_sector(text)
-        deadline = extract_deadline(text)
-        summary_text = summarize(text)
-        title_en = translate_to_english(title)
-        summary_en = None
-        confidence = 0.2
-        if deadline:
-            confidence += 0.4
-        if sector and sector != "unknown":
-            confidence += 0.2
-
-        pdf_text = text if len(text) < 200000 else text[:200000]
-        cur.execute(
-            """
-            INSERT INTO tenders (
-                source, buyer, title, summary, title_en, summary_en,
-                publish_date, deadline_date, sector, url, raw_article_id,
-                language, confidence_score, pdf_text, attachments_count
+        if insert_rows:
+            inserted = execute_values(
+                cur,
+                """
+                INSERT INTO tenders (
+                    source, buyer, title, summary, title_en, summary_en,
+                    publish_date, deadline_date, sector, url, raw_article_id,
+                    language, confidence_score, pdf_text, attachments_count
+                )
+                VALUES %s
+                ON CONFLICT (url) DO NOTHING
+                RETURNING 1
+                """,
+                insert_rows,
+                page_size=100,
+                fetch=True,
             )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            ON CONFLICT (url) DO NOTHING
-            """,
-            (
-                source_key or "unknown",
-                buyer,
-                title,
-                summary_text,
-                title_en,
-                summary_en,
-                publish_date,
-                deadline,
-                sector,
-                url,
-                rid,
-                language,
-                confidence,
-                pdf_text,
-                attachments_count,
-            ),
-        )
-        c_inserted += cur.rowcount
+            c_inserted += len(inserted)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        attach_cache.close()
+        _close_http()
 
     conn.commit()
     conn.close()
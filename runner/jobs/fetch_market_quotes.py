@@ -2,13 +2,16 @@ import json
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import psycopg2
+from psycopg2.extras import execute_values
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+import lxml.html
 
 
 CBL_FX_URL = "https://cbl.gov.ly/en/currency-exchange-rates/"
@@ -16,10 +19,16 @@ FRED_CSV_URL = "https://fred.stlouisfed.org/graph/fredgraph.csv"
 STOOQ_DAILY_CSV_URL = "https://stooq.com/q/d/l/"
 
 PARALLEL_FX_PATH = Path("/etc/libyaintel/parallel_fx.json")
+# FRED/Stooq history requested per series; only the latest value is used.
+SERIES_WINDOW_DAYS = int(os.getenv("MARKET_QUOTES_SERIES_WINDOW_DAYS") or "45")
 
 
 _NUM_RE = re.compile(r"([0-9]+(?:\.[0-9]+)?)")
 
+# Shared across the concurrent fetches so FRED/Stooq requests reuse connections.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
 
 @dataclass(frozen=True)
 class Quote:
@@ -49,7 +58,12 @@ def _parse_date_utc(value: str) -> datetime:
 def _parse_float(text: str) -> float | None:
     if not text:
         return None
-    m = _NUM_RE.search(text.replace(",", ""))
+    cleaned = text.replace(",", "").strip()
+    # Fast path for plain "123" / "4.5678" cells; anything else (signs, units,
+    # exponents, leading ".") goes through the regex as before.
+    if cleaned.isascii() and cleaned[:1].isdigit() and cleaned.replace(".", "", 1).isdigit():
+        return float(cleaned)
+    m = _NUM_RE.search(cleaned)
     if not m:
         return None
     try:
@@ -58,18 +72,24 @@ def _parse_float(text: str) -> float | None:
         return None
 
 
+def _cell_text(el) -> str:
+    # Same result as bs4's get_text(" ", strip=True).
+    return " ".join(t.strip() for t in el.itertext() if t.strip())
+
+
 def _fetch_cbl_official_fx(timeout_s: int) -> list[Quote]:
-    r = requests.get(
+    r = _SESSION.get(
         CBL_FX_URL,
         timeout=timeout_s,
         headers={"User-Agent": "Mozilla/5.0 (LibyaIntel market quotes)"},
     )
     r.raise_for_status()
 
-    soup = BeautifulSoup(r.text, "lxml")
-    table = soup.find("table", {"id": "currency-table"})
-    if table is None:
+    # lxml directly: the page only needs one small table, so skip building a bs4 tree.
+    tables = lxml.html.fromstring(r.text).xpath('//table[@id="currency-table"]')
+    if not tables:
         raise RuntimeError("CBL_PARSE_FAIL missing currency-table")
+    table = tables[0]
 
     # CBL uses names in the "Currency" column, typically prefixed with "Currency:".
     name_to_instrument = {
@@ -81,16 +101,15 @@ def _fetch_cbl_official_fx(timeout_s: int) -> list[Quote]:
     }
 
     out: list[Quote] = []
-    rows = table.find_all("tr")
-    for tr in rows:
-        tds = tr.find_all("td")
+    for tr in table.iter("tr"):
+        tds = tr.findall(".//td")
         if len(tds) < 6:
             continue
 
-        date_s = tds[0].get_text(" ", strip=True)
-        currency_name = tds[1].get_text(" ", strip=True)
-        unit_s = tds[2].get_text(" ", strip=True)
-        avg_s = tds[3].get_text(" ", strip=True)
+        date_s = _cell_text(tds[0])
+        currency_name = _cell_text(tds[1])
+        unit_s = _cell_text(tds[2])
+        avg_s = _cell_text(tds[3])
 
         date_s = re.sub(r"^date:\s*", "", date_s.strip(), flags=re.I)
 
@@ -171,54 +190,78 @@ def _read_parallel_manual_fx() -> list[Quote]:
     return out
 
 
+def _recent_window_start(days: int = SERIES_WINDOW_DAYS) -> datetime:
+    return _utc_now() - timedelta(days=days)
+
+
 def _fetch_fred_series(series_id: str, timeout_s: int) -> tuple[datetime, float]:
-    r = requests.get(
+    # Only the last value is used: ask for a recent window (cosd) and stream the
+    # lines, keeping just the latest non-missing observation.
+    start = _recent_window_start().strftime("%Y-%m-%d")
+    latest: tuple[str, float] | None = None
+    seen_rows = 0
+    with _SESSION.get(
         FRED_CSV_URL,
-        params={"id": series_id},
+        params={"id": series_id, "cosd": start},
         timeout=timeout_s,
         headers={"User-Agent": "Mozilla/5.0 (LibyaIntel market quotes)"},
-    )
-    r.raise_for_status()
-    lines = [ln.strip() for ln in r.text.splitlines() if ln.strip()]
-    if len(lines) < 2:
+        stream=True,
+    ) as r:
+        r.raise_for_status()
+        r.encoding = r.encoding or "utf-8"
+        lines = (ln.strip() for ln in r.iter_lines(decode_unicode=True) if ln and ln.strip())
+        next(lines, None)  # header
+        for ln in lines:
+            seen_rows += 1
+            parts = ln.split(",", 1)
+            if len(parts) != 2:
+                continue
+            date_s, val_s = parts[0].strip(), parts[1].strip()
+            if not val_s or val_s == ".":
+                continue
+            try:
+                latest = (date_s, float(val_s))
+            except ValueError:
+                continue
+    if not seen_rows:
         raise RuntimeError(f"FRED_EMPTY series={series_id}")
-
-    # Walk backwards to find latest non-missing.
-    for ln in reversed(lines[1:]):
-        parts = ln.split(",", 1)
-        if len(parts) != 2:
-            continue
-        date_s, val_s = parts[0].strip(), parts[1].strip()
-        if not val_s or val_s == ".":
-            continue
-        try:
-            value = float(val_s)
-        except ValueError:
-            continue
-        as_of = _parse_date_utc(date_s).replace(hour=0, minute=0, second=0, microsecond=0)
-        return as_of, value
-
-    raise RuntimeError(f"FRED_NO_VALUE series={series_id}")
+    if latest is None:
+        raise RuntimeError(f"FRED_NO_VALUE series={series_id}")
+    as_of = _parse_date_utc(latest[0]).replace(hour=0, minute=0, second=0, microsecond=0)
+    return as_of, latest[1]
 
 
 def _fetch_stooq_daily(symbol: str, timeout_s: int) -> tuple[datetime, float]:
-    r = requests.get(
+    # d1 limits the CSV to recent days; only the header and last row are kept.
+    start = _recent_window_start().strftime("%Y%m%d")
+    with _SESSION.get(
         STOOQ_DAILY_CSV_URL,
-        params={"s": symbol, "i": "d"},
+        params={"s": symbol, "i": "d", "d1": start},
         timeout=timeout_s,
         headers={"User-Agent": "Mozilla/5.0 (LibyaIntel market quotes)"},
-    )
-    r.raise_for_status()
-    lines = [ln.strip() for ln in r.text.splitlines() if ln.strip()]
-    if len(lines) < 2:
+        stream=True,
+    ) as r:
+        r.raise_for_status()
+        r.encoding = r.encoding or "utf-8"
+        header_line = None
+        last_line = None
+        for ln in r.iter_lines(decode_unicode=True):
+            ln = (ln or "").strip()
+            if not ln:
+                continue
+            if header_line is None:
+                header_line = ln
+            else:
+                last_line = ln
+    if header_line is None or last_line is None:
         raise RuntimeError(f"STOOQ_EMPTY symbol={symbol}")
-    header = lines[0].split(",")
+    header = header_line.split(",")
     # Expect Date,Open,High,Low,Close
     try:
         close_idx = header.index("Close")
     except ValueError:
         close_idx = 4
-    last = lines[-1].split(",")
+    last = last_line.split(",")
     if len(last) <= close_idx:
         raise RuntimeError(f"STOOQ_PARSE_FAIL symbol={symbol}")
     as_of = _parse_date_utc(last[0]).replace(hour=0, minute=0, second=0, microsecond=0)
@@ -229,25 +272,29 @@ def _fetch_stooq_daily(symbol: str, timeout_s: int) -> tuple[datetime, float]:
 def _upsert_quotes(conn, quotes: list[Quote]) -> int:
     if not quotes:
         return 0
-    cur = conn.cursor()
-    updated = 0
+    # One multi-row statement; a key repeated in the batch would make ON CONFLICT
+    # DO UPDATE fail, so the last quote per key wins, as the per-row loop did.
+    latest: dict[tuple, Quote] = {}
     for q in quotes:
-        cur.execute(
-            """
-            INSERT INTO market_quotes
-              (instrument, rate_type, quote_currency, value, unit, as_of, source_name, source_url, status, fetched_at)
-            VALUES
-              (%s,%s,%s,%s,%s,%s,%s,%s,%s, now())
-            ON CONFLICT (instrument, rate_type, quote_currency)
-            DO UPDATE SET
-              value = EXCLUDED.value,
-              unit = EXCLUDED.unit,
-              as_of = EXCLUDED.as_of,
-              source_name = EXCLUDED.source_name,
-              source_url = EXCLUDED.source_url,
-              status = EXCLUDED.status,
-              fetched_at = now()
-            """,
+        latest[(q.instrument, q.rate_type, q.quote_currency)] = q
+    cur = conn.cursor()
+    execute_values(
+        cur,
+        """
+        INSERT INTO market_quotes
+          (instrument, rate_type, quote_currency, value, unit, as_of, source_name, source_url, status, fetched_at)
+        VALUES %s
+        ON CONFLICT (instrument, rate_type, quote_currency)
+        DO UPDATE SET
+          value = EXCLUDED.value,
+          unit = EXCLUDED.unit,
+          as_of = EXCLUDED.as_of,
+          source_name = EXCLUDED.source_name,
+          source_url = EXCLUDED.source_url,
+          status = EXCLUDED.status,
+          fetched_at = now()
+        """,
+        [
             (
                 q.instrument,
                 q.rate_type,
@@ -258,10 +305,62 @@ def _upsert_quotes(conn, quotes: list[Quote]) -> int:
                 q.source_name,
                 q.source_url,
                 q.status,
-            ),
-        )
-        updated += 1
-    return updated
+            )
+            for q in latest.values()
+        ],
+        template="(%s,%s,%s,%s,%s,%s,%s,%s,%s, now())",
+    )
+    return len(quotes)
+
+
+# Metals from Stooq daily, commodities from FRED daily (no API key required for CSV export).
+_SERIES_QUOTES = [
+    {
+        "tag": "STOOQ_XAU",
+        "fetch": _fetch_stooq_daily,
+        "symbol": "xauusd",
+        "instrument": "XAU",
+        "unit": "USD per oz",
+        "source_name": "Stooq",
+        "source_url": f"{STOOQ_DAILY_CSV_URL}?s=xauusd&i=d",
+    },
+    {
+        "tag": "STOOQ_XAG",
+        "fetch": _fetch_stooq_daily,
+        "symbol": "xagusd",
+        "instrument": "XAG",
+        "unit": "USD per oz",
+        "source_name": "Stooq",
+        "source_url": f"{STOOQ_DAILY_CSV_URL}?s=xagusd&i=d",
+    },
+    {
+        "tag": "FRED_BRENT",
+        "fetch": _fetch_fred_series,
+        "symbol": "DCOILBRENTEU",
+        "instrument": "BRENT",
+        "unit": "USD per bbl",
+        "source_name": "FRED (EIA)",
+        "source_url": f"{FRED_CSV_URL}?id=DCOILBRENTEU",
+    },
+    {
+        "tag": "FRED_WTI",
+        "fetch": _fetch_fred_series,
+        "symbol": "DCOILWTICO",
+        "instrument": "WTI",
+        "unit": "USD per bbl",
+        "source_name": "FRED (EIA)",
+        "source_url": f"{FRED_CSV_URL}?id=DCOILWTICO",
+    },
+    {
+        "tag": "FRED_NG_HH",
+        "fetch": _fetch_fred_series,
+        "symbol": "DHHNGSP",
+        "instrument": "NG_HH",
+        "unit": "USD per MMBtu",
+        "source_name": "FRED (EIA)",
+        "source_url": f"{FRED_CSV_URL}?id=DHHNGSP",
+    },
+]
 
 
 def main() -> int:
@@ -273,109 +372,45 @@ def main() -> int:
     stale_after_min = int(os.getenv("MARKET_QUOTES_STALE_AFTER_MIN") or "180")
     timeout_s = int(os.getenv("MARKET_QUOTES_FETCH_TIMEOUT") or "15")
 
-    quotes: list[Quote] = []
-    try:
-        quotes += _fetch_cbl_official_fx(timeout_s=timeout_s)
-    except Exception as e:
-        # Keep last known values; staleness will be handled below.
-        print(f"MARKET_QUOTES_PARTIAL source=CBL err={type(e).__name__}")
-
-    try:
-        quotes += _read_parallel_manual_fx()
-    except Exception as e:
-        print(f"MARKET_QUOTES_PARTIAL source=PARALLEL_MANUAL err={type(e).__name__}")
-
-    # Metals (Stooq daily)
-    try:
-        as_of, value = _fetch_stooq_daily("xauusd", timeout_s=timeout_s)
-        quotes.append(
-            Quote(
-                instrument="XAU",
-                rate_type="spot",
-                quote_currency="USD",
-                value=value,
-                unit="USD per oz",
-                as_of=as_of,
-                source_name="Stooq",
-                source_url=f"{STOOQ_DAILY_CSV_URL}?s=xauusd&i=d",
-                status="ok",
-            )
-        )
-    except Exception as e:
-        print(f"MARKET_QUOTES_PARTIAL source=STOOQ_XAU err={type(e).__name__}")
-
-    try:
-        as_of, value = _fetch_stooq_daily("xagusd", timeout_s=timeout_s)
-        quotes.append(
-            Quote(
-                instrument="XAG",
-                rate_type="spot",
-                quote_currency="USD",
-                value=value,
-                unit="USD per oz",
-                as_of=as_of,
-                source_name="Stooq",
-                source_url=f"{STOOQ_DAILY_CSV_URL}?s=xagusd&i=d",
-                status="ok",
-            )
-        )
-    except Exception as e:
-        print(f"MARKET_QUOTES_PARTIAL source=STOOQ_XAG err={type(e).__name__}")
-
-    # Commodities (FRED daily; no API key required for CSV export).
-    try:
-        as_of, value = _fetch_fred_series("DCOILBRENTEU", timeout_s=timeout_s)
-        quotes.append(
-            Quote(
-                instrument="BRENT",
-                rate_type="spot",
-                quote_currency="USD",
-                value=value,
-                unit="USD per bbl",
-                as_of=as_of,
-                source_name="FRED (EIA)",
-                source_url=f"{FRED_CSV_URL}?id=DCOILBRENTEU",
-                status="ok",
-            )
-        )
-    except Exception as e:
-        print(f"MARKET_QUOTES_PARTIAL source=FRED_BRENT err={type(e).__name__}")
+    # Remote sources are fetched concurrently; results are collected in this order.
+    with ThreadPoolExecutor(max_workers=len(_SERIES_QUOTES) + 1) as ex:
+        cbl_fut = ex.submit(_fetch_cbl_official_fx, timeout_s=timeout_s)
+        series_futs = [
+            (spec, ex.submit(spec["fetch"], spec["symbol"], timeout_s=timeout_s))
+            for spec in _SERIES_QUOTES
+        ]
 
-    try:
-        as_of, value = _fetch_fred_series("DCOILWTICO", timeout_s=timeout_s)
-        quotes.append(
-            Quote(
-                instrument="WTI",
-                rate_type="spot",
-                quote_currency="USD",
-                value=value,
-                unit="USD per bbl",
-                as_of=as_of,
-                source_name="FRED (EIA)",
-                source_url=f"{FRED_CSV_URL}?id=DCOILWTICO",
-                status="ok",
-            )
-        )
-    except Exception as e:
-        print(f"MARKET_QUOTES_PARTIAL source=FRED_WTI err={type(e).__name__}")
+        quotes: list[Quote] = []
+        try:
+            quotes += cbl_fut.result()
+        except Exception as e:
+            # Keep last known values; staleness will be handled below.
+            print(f"MARKET_QUOTES_PARTIAL source=CBL err={type(e).__name__}")
 
-    try:
-        as_of, value = _fetch_fred_series("DHHNGSP", timeout_s=timeout_s)
-        quotes.append(
-            Quote(
-                instrument="NG_HH",
-                rate_type="spot",
-                quote_currency="USD",
-                value=value,
-                unit="USD per MMBtu",
-                as_of=as_of,
-                source_name="FRED (EIA)",
-                source_url=f"{FRED_CSV_URL}?id=DHHNGSP",
-                status="ok",
+        try:
+            quotes += _read_parallel_manual_fx()
+        except Exception as e:
+            print(f"MARKET_QUOTES_PARTIAL source=PARALLEL_MANUAL err={type(e).__name__}")
+
+        for spec, fut in series_futs:
+            try:
+                as_of, value = fut.result()
+            except Exception as e:
+                print(f"MARKET_QUOTES_PARTIAL source={spec['tag']} err={type(e).__name__}")
+                continue
+            quotes.append(
+                Quote(
+                    instrument=spec["instrument"],
+                    rate_type="spot",
+                    quote_currency="USD",
+                    value=value,
+                    unit=spec["unit"],
+                    as_of=as_of,
+                    source_name=spec["source_name"],
+                    source_url=spec["source_url"],
+                    status="ok",
+                )
             )
-        )
-    except Exception as e:
-        print(f"MARKET_QUOTES_PARTIAL source=FRED_NG_HH err={type(e).__name__}")
 
     now = _utc_now()
     stale_threshold = now - timedelta(minutes=stale_after_min)
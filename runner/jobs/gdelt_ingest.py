@@ -2,21 +2,39 @@ import hashlib
 import json
 import os
 import random
+import re
 import sys
+import threading
 import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from backend.db import (
     finish_ingest_run,
     get_client,
+    get_existing_external_ids,
     get_source_id,
+    merge_gdelt_topics,
     start_ingest_run,
-    upsert_feed_item,
+    upsert_feed_items,
 )
 from backend.config import get_int
 
@@ -32,42 +50,52 @@ SLEEP_JITTER = float(os.getenv("GDELT_SLEEP_JITTER", "0.8"))
 BACKOFF_CAP_SEC = int(os.getenv("GDELT_BACKOFF_CAP_SEC", "120")) or 120
 RUN_LANG = os.getenv("GDELT_RUN_LANG", "all").strip().lower()
 STOP_AFTER_CONSEC_429 = int(os.getenv("GDELT_STOP_AFTER_CONSEC_429", "2")) or 2
+FETCH_WORKERS = int(os.getenv("GDELT_FETCH_WORKERS", "4")) or 1
+# Minimum spacing between request starts across all workers (GDELT allows ~1 per 5s).
+MIN_REQUEST_GAP_SEC = float(os.getenv("GDELT_MIN_REQUEST_GAP_SEC", "5"))
+GATE_MAX_SCALE = float(os.getenv("GDELT_GATE_MAX_SCALE", "8")) or 8.0
+GATE_RECOVER_STEP = float(os.getenv("GDELT_GATE_RECOVER_STEP", "0.25"))
+WRITE_BATCH = int(os.getenv("GDELT_WRITE_BATCH", "100")) or 100
 QUERY_OVERRIDE = os.getenv("GDELT_QUERY_OVERRIDE", "").strip()
 QUERY_OVERRIDE_TOPIC = os.getenv("GDELT_QUERY_OVERRIDE_TOPIC", "").strip()
 DUMP_BODY_PATH = os.getenv("GDELT_DUMP_BODY_PATH", "").strip()
 DEBUG = os.getenv("GDELT_DEBUG", "0").strip() == "1"
 _deny_raw = os.getenv("GDELT_DOMAIN_DENYLIST", "")
-DOMAIN_DENYLIST = {
+DOMAIN_DENYLIST = frozenset(
     d.strip().lower().lstrip(".") for d in _deny_raw.split(",") if d.strip()
-}
+)
 _allow_raw = os.getenv("GDELT_DOMAIN_ALLOWLIST", "")
-DOMAIN_ALLOWLIST = {
+DOMAIN_ALLOWLIST = frozenset(
     d.strip().lower().lstrip(".") for d in _allow_raw.split(",") if d.strip()
-}
+)
 _denylist_default_used = False
 if not DOMAIN_DENYLIST:
-    DOMAIN_DENYLIST = {
-        "facebook.com",
-        "twitter.com",
-        "x.com",
-        "youtube.com",
-        "t.me",
-        "telegram.me",
-        "instagram.com",
-    }
+    DOMAIN_DENYLIST = frozenset(
+        {
+            "facebook.com",
+            "twitter.com",
+            "x.com",
+            "youtube.com",
+            "t.me",
+            "telegram.me",
+            "instagram.com",
+        }
+    )
     _denylist_default_used = True
 
-_DROP_PARAMS = {
-    "fbclid",
-    "gclid",
-    "utm_source",
-    "utm_medium",
-    "utm_campaign",
-    "utm_term",
-    "utm_content",
-    "utm_id",
-    "mc_eid",
-}
+_DROP_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "utm_source",
+        "utm_medium",
+        "utm_campaign",
+        "utm_term",
+        "utm_content",
+        "utm_id",
+        "mc_eid",
+    }
+)
 
 _TAG_KEYWORDS = {
     "tenders": [
@@ -170,21 +198,55 @@ _TAG_KEYWORDS = {
 }
 
 
+_TAGS_BY_KEYWORD: dict[str, set[str]] = {}
+for _tag, _kws in _TAG_KEYWORDS.items():
+    for _kw in _kws:
+        _TAGS_BY_KEYWORD.setdefault(_kw, set()).add(_tag)
+
+
+def _tag_automaton():
+    # One Aho-Corasick pass per text instead of a substring scan per tag keyword.
+    if ahocorasick is None:
+        return None
+    ac = ahocorasick.Automaton()
+    for kw, tags in _TAGS_BY_KEYWORD.items():
+        ac.add_word(kw, frozenset(tags))
+    ac.make_automaton()
+    return ac
+
+
+_TAG_AC = _tag_automaton()
+DEFAULT_LOCATION_TERMS = ["libya", "libyan", "tripoli", "benghazi", "misrata"]
+
+
+def _is_dropped_param(key: str) -> bool:
+    return key in _DROP_PARAMS or key.startswith("utm_")
+
+
+# Articles recur across topics, so normalized URLs and their hashes are memoized.
+@lru_cache(maxsize=50_000)
 def _normalize_url(url: str) -> str:
     if not url:
         return url
     url = url.strip()
+    if "?" not in url and "#" not in url and ";" not in url:
+        # Common case for news URLs: nothing to drop, only case and trailing slash.
+        scheme, sep, rest = url.partition("://")
+        if sep and scheme.isalpha():
+            host, slash, path = rest.partition("/")
+            rebuilt = f"{scheme.lower()}://{host.lower()}{slash}{path}"
+            if rebuilt.endswith("/") and slash + path != "/":
+                rebuilt = rebuilt[:-1]
+            return rebuilt
     parsed = urlparse(url)
     scheme = (parsed.scheme or "https").lower()
     netloc = (parsed.netloc or "").lower()
     path = parsed.path or ""
-    query_items = []
-    for k, v in parse_qsl(parsed.query, keep_blank_values=True):
-        if k.lower().startswith("utm_"):
-            continue
-        if k.lower() in _DROP_PARAMS:
-            continue
-        query_items.append((k, v))
+    query_items = [
+        (k, v)
+        for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not _is_dropped_param(k.lower())
+    ]
     query = urlencode(query_items, doseq=True)
     rebuilt = urlunparse((scheme, netloc, path, "", query, ""))
     if rebuilt.endswith("/") and path != "/":
@@ -192,6 +254,7 @@ def _normalize_url(url: str) -> str:
     return rebuilt
 
 
+@lru_cache(maxsize=50_000)
 def _sha1(text: str) -> str:
     return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
@@ -206,25 +269,56 @@ def _domain_from_url(url: str) -> str:
     return host
 
 
-def _keyword_match(tags: list[str], text: str) -> bool:
+def _domain_in(domain: str, domains: frozenset[str]) -> bool:
+    # Matches the domain itself or any parent, so m.facebook.com hits facebook.com.
+    while domain:
+        if domain in domains:
+            return True
+        _, _, domain = domain.partition(".")
+    return False
+
+
+@lru_cache(maxsize=None)
+def _tag_keywords(tags: tuple[str, ...]) -> tuple[str, ...]:
+    # Flattened, de-duplicated keywords for a topic's tags (fallback matcher).
+    return tuple(dict.fromkeys(kw for tag in tags for kw in _TAG_KEYWORDS.get(tag, ())))
+
+
+def _keyword_match(tags: tuple[str, ...], text: str) -> bool:
+    # text is already lowercased by the caller.
     if not tags or not text:
         return False
-    text = text.lower()
-    for tag in tags:
-        for kw in _TAG_KEYWORDS.get(tag, []):
-            if kw in text:
+    if _TAG_AC is not None:
+        tag_set = set(tags)
+        for _, kw_tags in _TAG_AC.iter(text):
+            if not tag_set.isdisjoint(kw_tags):
                 return True
-    return False
+        return False
+    return any(kw in text for kw in _tag_keywords(tags))
+
 
+def _terms_re(terms: list[str] | None) -> re.Pattern | None:
+    terms = [t.lower() for t in terms or [] if t]
+    if not terms:
+        return None
+    return re.compile("|".join(map(re.escape, terms)))
 
-def _term_match(terms: list[str] | None, text: str) -> bool:
-    if not terms or not text:
+
+def _term_match(terms_re: re.Pattern | None, text: str) -> bool:
+    # text is already lowercased by the caller.
+    if terms_re is None or not text:
         return False
-    text = text.lower()
-    for term in terms:
-        if term and term.lower() in text:
-            return True
-    return False
+    return terms_re.search(text) is not None
+
+
+def _json_loads(body: bytes):
+    # orjson when available; stdlib json still decides anything orjson rejects.
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except ValueError:
+            pass
+    return json.loads(body)
 
 
 def _parse_seendate(val: str | None) -> str:
@@ -237,21 +331,142 @@ def _parse_seendate(val: str | None) -> str:
         return datetime.now(timezone.utc).isoformat()
 
 
-def _load_topics() -> list[dict]:
+@dataclass(frozen=True, slots=True)
+class Topic:
+    key: str
+    query: str
+    enabled: bool
+    priority: int
+    lang: str
+    tags: tuple[str, ...]
+    timespan: str
+    maxrecords: int
+    max_processed_per_topic: int
+    sleep_override_sec: float | None
+    preferred_domains: frozenset[str]
+    # Term lists compiled once at load rather than scanned per article.
+    loc_re: re.Pattern | None
+    req_re: re.Pattern | None
+    req_any_re: re.Pattern | None
+    req_any2_re: re.Pattern | None
+
+
+def _topic_from_config(cfg: dict) -> Topic:
+    sleep_override = cfg.get("sleep_override_sec")
+    return Topic(
+        key=cfg.get("key") or "unknown",
+        query=cfg.get("query") or "",
+        enabled=bool(cfg.get("enabled", True)),
+        priority=int(cfg.get("priority", 50)),
+        lang=(cfg.get("lang") or "").lower(),
+        tags=tuple(cfg.get("tags") or ()),
+        timespan=cfg.get("timespan") or "24h",
+        maxrecords=int(cfg.get("maxrecords") or 100),
+        max_processed_per_topic=int(cfg.get("max_processed_per_topic") or 0),
+        sleep_override_sec=None if sleep_override is None else float(sleep_override),
+        preferred_domains=frozenset(cfg.get("preferred_domains") or ()),
+        loc_re=_terms_re(cfg.get("location_terms") or DEFAULT_LOCATION_TERMS),
+        req_re=_terms_re(cfg.get("require_terms")),
+        req_any_re=_terms_re(cfg.get("require_terms_any")),
+        req_any2_re=_terms_re(cfg.get("require_terms_any2")),
+    )
+
+
+def _load_topics() -> list[Topic]:
     with CONFIG_PATH.open("r", encoding="utf-8") as f:
-        return json.load(f)
+        return [_topic_from_config(cfg) for cfg in json.load(f) if cfg]
+
+
+# One keep-alive session for every GDELT call; retries stay in _request_with_backoff.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+)
+_SESSION.headers["User-Agent"] = "Mozilla/5.0 (LibyaIntel gdelt ingest)"
+_BACKOFF_LOCK = threading.Lock()
+
+
+class _RateGate:
+    # Spaces request starts across fetch workers. The spacing adapts AIMD-style:
+    # each 429 doubles it (up to GATE_MAX_SCALE) and holds every worker for the
+    # Retry-After; each success walks it back toward the configured gap.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 0.0
+        self._scale = 1.0
+
+    def wait(self, gap: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + gap * self._scale
+        if start > now:
+            time.sleep(start - now)
+
+    def hold(self, seconds: float) -> None:
+        with self._lock:
+            self._scale = min(self._scale * 2, GATE_MAX_SCALE)
+            self._next = max(self._next, time.monotonic() + seconds)
+
+    def ok(self) -> None:
+        with self._lock:
+            self._scale = max(1.0, self._scale - GATE_RECOVER_STEP)
+
+    @property
+    def scale(self) -> float:
+        return self._scale
+
+
+_GATE = _RateGate()
+
+
+def _topic_gap(topic: Topic) -> float:
+    if topic.sleep_override_sec is None:
+        gap = SLEEP_BASE + random.uniform(0, SLEEP_JITTER)
+    else:
+        gap = topic.sleep_override_sec
+    return max(MIN_REQUEST_GAP_SEC, gap)
+
+
+def _topic_params(topic: Topic) -> dict | None:
+    query = topic.query
+    if QUERY_OVERRIDE and (
+        not QUERY_OVERRIDE_TOPIC or QUERY_OVERRIDE_TOPIC == topic.key
+    ):
+        print(f"GDELT_QUERY_OVERRIDE topic={topic.key}")
+        query = QUERY_OVERRIDE
+    if not query:
+        return None
+    return {
+        "query": query,
+        "mode": "artlist",
+        "format": "json",
+        "maxrecords": topic.maxrecords,
+        "timespan": topic.timespan,
+        "sort": "datedesc",
+    }
 
 
 def _request_with_backoff(
-    params: dict, remaining_backoff: list[int], topic_key: str
+    params: dict,
+    remaining_backoff: list[int],
+    topic_key: str,
+    gap: float = 0.0,
+    stop: threading.Event | None = None,
 ) -> tuple[dict | None, bool]:
     delay = 2
     saw_429 = False
     for attempt in range(1, MAX_RETRIES + 1):
+        if stop is not None and stop.is_set():
+            return None, saw_429
+        _GATE.wait(gap)
+        # Workers parked on the gate must not fire once a stop lands mid-wait.
+        if stop is not None and stop.is_set():
+            return None, saw_429
         try:
             fetch_start = time.monotonic()
             print(f"GDELT_FETCH_START topic={topic_key} url={API_URL}")
-            resp = requests.get(
+            resp = _SESSION.get(
                 API_URL, params=params, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT)
             )
             fetch_ms = int((time.monotonic() - fetch_start) * 1000)
@@ -287,15 +502,20 @@ def _request_with_backoff(
                         ra = 15
                 else:
                     ra = min(delay * 3, 60)
-                if remaining_backoff[0] <= 0:
+                with _BACKOFF_LOCK:
+                    exhausted = remaining_backoff[0] <= 0
+                    sleep_for = 0 if exhausted else min(ra, remaining_backoff[0])
+                    remaining_backoff[0] -= sleep_for
+                if exhausted:
                     print(
                         f"GDELT_FAIL topic={topic_key} status=429 budget_exhausted=1 query={params.get('query')}"
                     )
                     return None, True
-                sleep_for = min(ra, remaining_backoff[0])
-                remaining_backoff[0] -= sleep_for
-                print(f"GDELT_BACKOFF topic={topic_key} status=429 sleep={sleep_for}")
-                time.sleep(sleep_for)
+                _GATE.hold(sleep_for)
+                print(
+                    f"GDELT_BACKOFF topic={topic_key} status=429 sleep={sleep_for} "
+                    f"gate_scale={_GATE.scale:g}"
+                )
                 delay = min(delay * 2, 30)
                 continue
             if resp.status_code >= 500:
@@ -317,7 +537,8 @@ def _request_with_backoff(
             if not resp.text or not resp.text.strip():
                 print(f"GDELT_FAIL topic={topic_key} status=200 empty_body=1")
                 return None, saw_429
-            return resp.json(), saw_429
+            _GATE.ok()
+            return _json_loads(resp.content), saw_429
         except Exception as e:
             print(
                 f"GDELT_FETCH_ERROR topic={topic_key} err={type(e).__name__} msg={str(e)[:200]}"
@@ -327,7 +548,11 @@ def _request_with_backoff(
                     f"GDELT_FAIL topic={topic_key} error={type(e).__name__} msg={str(e)[:200]}"
                 )
                 return None, saw_429
-            time.sleep(delay)
+            if stop is not None:
+                if stop.is_set() or stop.wait(delay):
+                    return None, saw_429
+            else:
+                time.sleep(delay)
             delay = min(delay * 2, 30)
     return None, saw_429
 
@@ -389,9 +614,86 @@ def main() -> int:
         raise SystemExit(error_msg)
 
     topic_update_cache: dict[str, set[str]] = {}
+    # external_ids known to exist in feed_items. Existence checks are batched per
+    # topic; topic merges are queued and applied server-side in batches.
+    existing_ids: set[str] = set()
+    checked_ids: set[str] = set()
+    pending_merges: dict[str, dict] = {}
+    # New articles are upserted in batches; (feed_item, topic_stats, topic_key).
+    pending_items: list[tuple[dict, dict, str]] = []
+
+    def _load_existing(external_ids: list[str]) -> None:
+        ids = [i for i in external_ids if i not in checked_ids]
+        if not ids:
+            return
+        checked_ids.update(ids)
+        try:
+            existing_ids.update(get_existing_external_ids(sb, ids))
+        except Exception as e:
+            print(f"GDELT_EXISTS_FAIL err={type(e).__name__} msg={str(e)[:200]}")
+
+    def _flush_inserts() -> None:
+        if not pending_items:
+            return
+        batch = pending_items[:]
+        pending_items.clear()
+        try:
+            upsert_feed_items(sb, [item for item, _, _ in batch])
+        except Exception as e:
+            print(
+                f"GDELT_BATCH_FAIL rows={len(batch)} err={type(e).__name__} "
+                f"msg={str(e)[:200]} fallback=per_row"
+            )
+            # One bad row should not fail the batch; retry rows one at a time.
+            kept = []
+            for entry in batch:
+                item, t_stats, t_key = entry
+                try:
+                    upsert_feed_items(sb, [item])
+                except Exception as row_e:
+                    existing_ids.discard(item["external_id"])
+                    pending_merges.pop(item["external_id"], None)
+                    t_stats["failed"] += 1
+                    stats["failed"] += 1
+                    print(
+                        f"GDELT_ITEM_FAIL topic={t_key} external_id={item['external_id']} "
+                        f"err={type(row_e).__name__} msg={str(row_e)[:200]}"
+                    )
+                    continue
+                kept.append(entry)
+            batch = kept
+        for _, t_stats, _ in batch:
+            t_stats["inserted_new"] += 1
+            stats["inserted_new"] += 1
+
+    def _flush_merges() -> None:
+        # Inserts go first so merges into rows added this run find them.
+        _flush_inserts()
+        if not pending_merges:
+            return
+        rows = [{"external_id": k, **v} for k, v in pending_merges.items()]
+        pending_merges.clear()
+        try:
+            merge_gdelt_topics(sb, rows)
+        except Exception as e:
+            print(f"GDELT_MERGE_FAIL rows={len(rows)} err={type(e).__name__}")
+
+    skip_sampled = 0
+
+    def _skip(topic_stats: dict, topic_key: str, reason: str, norm: str | None = None) -> None:
+        nonlocal skip_sampled
+        key = f"skipped_{reason}"
+        topic_stats["skipped"] += 1
+        topic_stats[key] += 1
+        stats["skipped"] += 1
+        stats[key] += 1
+        if DEBUG and skip_sampled < 3:
+            skip_sampled += 1
+            suffix = f" url={norm}" if norm else ""
+            print(f"GDELT_SKIP_SAMPLE topic={topic_key} reason={reason}{suffix}")
 
     def _merge_topics_for_external_id(
-        external_id: str, topic_key: str, tags: list[str], raw_url: str | None
+        external_id: str, topic_key: str, tags: tuple[str, ...], raw_url: str | None
     ) -> None:
         if not external_id:
             return
@@ -399,61 +701,36 @@ def main() -> int:
         if topic_key in cached:
             return
         cached.add(topic_key)
-        try:
-            res = (
-                sb.table("feed_items")
-                .select("raw")
-                .eq("external_id", external_id)
-                .limit(1)
-                .execute()
-            )
-        except Exception:
-            return
-        if not res.data:
-            return
-        raw = res.data[0].get("raw") or {}
-        if not isinstance(raw, dict):
-            raw = {}
-        gdelt = raw.get("gdelt") or {}
-        if not isinstance(gdelt, dict):
-            gdelt = {}
-        topics_found = gdelt.get("topics_found") or []
-        if not isinstance(topics_found, list):
-            topics_found = []
-        if topic_key not in topics_found:
-            topics_found.append(topic_key)
-        merged_tags = gdelt.get("tags") or []
-        if not isinstance(merged_tags, list):
-            merged_tags = []
-        for tag in tags or []:
-            if tag not in merged_tags:
-                merged_tags.append(tag)
-        raw_urls = gdelt.get("raw_urls") or []
-        if not isinstance(raw_urls, list):
-            raw_urls = []
-        if raw_url and raw_url not in raw_urls:
-            raw_urls.append(raw_url)
-        gdelt["topics_found"] = topics_found
-        gdelt["tags"] = merged_tags
-        gdelt["raw_urls"] = raw_urls
-        raw["gdelt"] = gdelt
-        try:
-            sb.table("feed_items").update({"raw": raw}).eq(
-                "external_id", external_id
-            ).execute()
-        except Exception:
+        if external_id not in existing_ids:
             return
+        merge = pending_merges.setdefault(
+            external_id, {"topics_found": [], "tags": [], "raw_urls": []}
+        )
+        if topic_key not in merge["topics_found"]:
+            merge["topics_found"].append(topic_key)
+        for tag in tags or ():
+            if tag not in merge["tags"]:
+                merge["tags"].append(tag)
+        if raw_url and raw_url not in merge["raw_urls"]:
+            merge["raw_urls"].append(raw_url)
+        if len(pending_merges) >= WRITE_BATCH:
+            _flush_merges()
+
+    executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    stop_fetches = threading.Event()
+
+    def _stop_fetching() -> None:
+        # Queued topics are dropped and in-flight ones give up at their next stop check.
+        stop_fetches.set()
+        executor.shutdown(wait=False, cancel_futures=True)
 
     try:
         remaining_backoff = [BACKOFF_CAP_SEC]
-        topics = sorted(
-            topics, key=lambda t: int(t.get("priority", 50)) if t else 50
-        )
+        topics = sorted(topics, key=lambda t: t.priority)
         disabled_keys = []
         for t in topics:
-            if not t.get("enabled", True):
-                key = t.get("key") or "unknown"
-                disabled_keys.append(key)
+            if not t.enabled:
+                disabled_keys.append(t.key)
         if disabled_keys:
             print(
                 "GDELT_TOPICS "
@@ -461,7 +738,7 @@ def main() -> int:
                 "reason=disabled_in_config"
             )
         if topics_filter:
-            topics = [t for t in topics if t.get("key") in topics_filter]
+            topics = [t for t in topics if t.key in topics_filter]
             if not topics:
                 error_msg = f"no_topics_matched filter={','.join(sorted(topics_filter))}"
                 finish_ingest_run(sb, run_id, ok=False, stats=stats, error=error_msg)
@@ -470,7 +747,7 @@ def main() -> int:
                 f"GDELT_TOPICS filtered={len(topics)} keys={','.join(sorted(topics_filter))}"
             )
         if RUN_LANG in {"en", "ar"}:
-            topics = [t for t in topics if (t.get("lang") or "").lower() == RUN_LANG]
+            topics = [t for t in topics if t.lang == RUN_LANG]
             if not topics:
                 error_msg = f"no_topics_matched lang={RUN_LANG}"
                 finish_ingest_run(sb, run_id, ok=False, stats=stats, error=error_msg)
@@ -480,12 +757,29 @@ def main() -> int:
             f"lang={RUN_LANG} topics={len(topics)} max_total={max_total} "
             f"connect_timeout={CONNECT_TIMEOUT} read_timeout={REQUEST_TIMEOUT}"
         )
-        consecutive_429 = 0
+        # Fetches run ahead on a small pool, paced by the shared gate; results are
+        # still consumed in priority order so budgets and 429 stops behave as before.
+        fetches = []
         for topic in topics:
+            params = _topic_params(topic) if topic.enabled else None
+            fetches.append(
+                executor.submit(
+                    _request_with_backoff,
+                    params,
+                    remaining_backoff,
+                    topic.key,
+                    _topic_gap(topic),
+                    stop_fetches,
+                )
+                if params
+                else None
+            )
+        consecutive_429 = 0
+        for topic, fetch in zip(topics, fetches):
             try:
-                if not topic.get("enabled", True):
+                if not topic.enabled:
                     continue
-                topic_key = topic.get("key") or "unknown"
+                topic_key = topic.key
                 topic_stats = stats["by_topic"].setdefault(
                     topic_key,
                     {
@@ -508,26 +802,10 @@ def main() -> int:
                 if max_total <= 0:
                     break
 
-                query = topic.get("query") or ""
-                if QUERY_OVERRIDE and (
-                    not QUERY_OVERRIDE_TOPIC or QUERY_OVERRIDE_TOPIC == topic_key
-                ):
-                    print(f"GDELT_QUERY_OVERRIDE topic={topic_key}")
-                    query = QUERY_OVERRIDE
-                if not query:
+                if fetch is None:
                     continue
 
-                params = {
-                    "query": query,
-                    "mode": "artlist",
-                    "format": "json",
-                    "maxrecords": int(topic.get("maxrecords") or 100),
-                    "timespan": topic.get("timespan") or "24h",
-                    "sort": "datedesc",
-                }
-                data, saw_429 = _request_with_backoff(
-                    params, remaining_backoff, topic_key
-                )
+                data, saw_429 = fetch.result()
                 if not data:
                     topic_stats["failed"] += 1
                     stats["failed"] += 1
@@ -554,180 +832,83 @@ def main() -> int:
                         "skipped=0 failed=0 note=budget_exhausted"
                     )
                     continue
-                max_per_topic = int(topic.get("max_processed_per_topic") or 0)
+                max_per_topic = topic.max_processed_per_topic
                 if max_per_topic > 0:
                     remaining_budget = min(remaining_budget, max_per_topic)
                 docs_to_process = articles[:remaining_budget]
+                # (item, normalized url, external_id), computed once per article.
+                keyed_docs = []
+                for item in docs_to_process:
+                    norm = _normalize_url(item["url"]) if item.get("url") else ""
+                    keyed_docs.append((item, norm, _sha1(norm) if norm else ""))
+                _load_existing([ext_id for _, _, ext_id in keyed_docs if ext_id])
                 skip_sampled = 0
                 accepted_sampled = 0
-                for item in docs_to_process:
+                loc_re = topic.loc_re
+                require_terms = topic.req_re
+                require_terms_any = topic.req_any_re
+                require_terms_any2 = topic.req_any2_re
+                preferred_domains = topic.preferred_domains
+                tags = topic.tags
+                for item, norm, external_id in keyed_docs:
                     url = item.get("url")
                     if not url:
-                        topic_stats["skipped"] += 1
-                        topic_stats["skipped_missing_url"] += 1
-                        stats["skipped"] += 1
-                        stats["skipped_missing_url"] += 1
-                        if DEBUG and skip_sampled < 3:
-                            skip_sampled += 1
-                            print(
-                                "GDELT_SKIP_SAMPLE "
-                                f"topic={topic_key} reason=missing_url"
-                            )
+                        _skip(topic_stats, topic_key, "missing_url")
                         continue
                     topic_stats["processed"] += 1
                     stats["items_processed"] += 1
-                    norm = _normalize_url(url)
                     domain = _domain_from_url(norm)
-                    if DOMAIN_ALLOWLIST and domain and domain not in DOMAIN_ALLOWLIST:
-                        topic_stats["skipped"] += 1
-                        topic_stats["skipped_allowlist"] += 1
-                        stats["skipped"] += 1
-                        stats["skipped_allowlist"] += 1
-                        if DEBUG and skip_sampled < 3:
-                            skip_sampled += 1
-                            print(
-                                "GDELT_SKIP_SAMPLE "
-                                f"topic={topic_key} reason=allowlist url={norm}"
-                            )
+                    if DOMAIN_ALLOWLIST and domain and not _domain_in(domain, DOMAIN_ALLOWLIST):
+                        _skip(topic_stats, topic_key, "allowlist", norm)
                         continue
-                    if domain and domain in DOMAIN_DENYLIST:
-                        topic_stats["skipped"] += 1
-                        topic_stats["skipped_denylist"] += 1
-                        stats["skipped"] += 1
-                        stats["skipped_denylist"] += 1
-                        if DEBUG and skip_sampled < 3:
-                            skip_sampled += 1
-                            print(
-                                "GDELT_SKIP_SAMPLE "
-                                f"topic={topic_key} reason=denylist url={norm}"
-                            )
+                    if domain and _domain_in(domain, DOMAIN_DENYLIST):
+                        _skip(topic_stats, topic_key, "denylist", norm)
                         continue
                     title = (item.get("title") or "").strip()
                     snippet = (item.get("snippet") or "").strip()
-                    text_blob = f"{title} {snippet}".strip()
-                    location_terms = topic.get("location_terms") or [
-                        "libya",
-                        "libyan",
-                        "tripoli",
-                        "benghazi",
-                        "misrata",
-                    ]
-                    require_terms = topic.get("require_terms") or []
-                    require_terms_any = topic.get("require_terms_any") or []
-                    require_terms_any2 = topic.get("require_terms_any2") or []
-                    preferred_domains = topic.get("preferred_domains") or []
+                    text_blob = f"{title} {snippet}".strip().lower()
                     preferred_hit = domain in preferred_domains
-                    if not _term_match(location_terms, text_blob):
-                        topic_stats["skipped"] += 1
-                        topic_stats["skipped_not_relevant"] += 1
-                        stats["skipped"] += 1
-                        stats["skipped_not_relevant"] += 1
-                        if DEBUG and skip_sampled < 3:
-                            skip_sampled += 1
-                            print(
-                                "GDELT_SKIP_SAMPLE "
-                                f"topic={topic_key} reason=not_relevant url={norm}"
-                            )
-                        continue
-                    if require_terms_any and require_terms_any2:
-                        if not (
+                    if not _term_match(loc_re, text_blob):
+                        relevant = False
+                    elif require_terms_any and require_terms_any2:
+                        relevant = preferred_hit or (
                             _term_match(require_terms_any, text_blob)
                             and _term_match(require_terms_any2, text_blob)
-                        ):
-                            if not preferred_hit:
-                                topic_stats["skipped"] += 1
-                                topic_stats["skipped_not_relevant"] += 1
-                                stats["skipped"] += 1
-                                stats["skipped_not_relevant"] += 1
-                                if DEBUG and skip_sampled < 3:
-                                    skip_sampled += 1
-                                    print(
-                                        "GDELT_SKIP_SAMPLE "
-                                        f"topic={topic_key} reason=not_relevant url={norm}"
-                                    )
-                                continue
+                        )
                     elif require_terms and not _term_match(require_terms, text_blob):
-                        if not preferred_hit:
-                            topic_stats["skipped"] += 1
-                            topic_stats["skipped_not_relevant"] += 1
-                            stats["skipped"] += 1
-                            stats["skipped_not_relevant"] += 1
-                            if DEBUG and skip_sampled < 3:
-                                skip_sampled += 1
-                                print(
-                                    "GDELT_SKIP_SAMPLE "
-                                    f"topic={topic_key} reason=not_relevant url={norm}"
-                                )
-                            continue
-                    elif not _keyword_match(topic.get("tags") or [], text_blob):
-                        topic_stats["skipped"] += 1
-                        topic_stats["skipped_not_relevant"] += 1
-                        stats["skipped"] += 1
-                        stats["skipped_not_relevant"] += 1
-                        if DEBUG and skip_sampled < 3:
-                            skip_sampled += 1
-                            print(
-                                "GDELT_SKIP_SAMPLE "
-                                f"topic={topic_key} reason=not_relevant url={norm}"
-                            )
+                        relevant = preferred_hit
+                    else:
+                        relevant = _keyword_match(tags, text_blob)
+                    if not relevant:
+                        _skip(topic_stats, topic_key, "not_relevant", norm)
                         continue
                     if not norm or norm in seen_urls:
                         if norm:
                             _merge_topics_for_external_id(
-                                _sha1(norm), topic_key, topic.get("tags") or [], url
+                                external_id, topic_key, tags, url
                             )
                         topic_stats["dedup_existing"] += 1
                         stats["dedup_existing"] += 1
-                        topic_stats["skipped"] += 1
-                        topic_stats["skipped_duplicate"] += 1
-                        stats["skipped"] += 1
-                        stats["skipped_duplicate"] += 1
-                        if DEBUG and skip_sampled < 3:
-                            skip_sampled += 1
-                            print(
-                                "GDELT_SKIP_SAMPLE "
-                                f"topic={topic_key} reason=duplicate url={norm}"
-                            )
+                        _skip(topic_stats, topic_key, "duplicate", norm)
                         continue
                     seen_urls.add(norm)
-                    external_id = _sha1(norm)
 
-                    try:
-                        exists = (
-                            sb.table("feed_items")
-                            .select("id")
-                            .eq("external_id", external_id)
-                            .limit(1)
-                            .execute()
+                    if external_id in existing_ids:
+                        _merge_topics_for_external_id(
+                            external_id, topic_key, tags, url
                         )
-                        if exists.data:
-                            _merge_topics_for_external_id(
-                                external_id, topic_key, topic.get("tags") or [], url
-                            )
-                            topic_stats["updated_existing"] += 1
-                            stats["updated_existing"] += 1
-                            topic_stats["skipped"] += 1
-                            topic_stats["skipped_duplicate"] += 1
-                            stats["skipped"] += 1
-                            stats["skipped_duplicate"] += 1
-                            if DEBUG and skip_sampled < 3:
-                                skip_sampled += 1
-                                print(
-                                    "GDELT_SKIP_SAMPLE "
-                                    f"topic={topic_key} reason=duplicate url={norm}"
-                                )
-                            continue
-                    except Exception:
-                        pass
+                        topic_stats["updated_existing"] += 1
+                        stats["updated_existing"] += 1
+                        _skip(topic_stats, topic_key, "duplicate", norm)
+                        continue
 
                     published_at = _parse_seendate(item.get("seendate"))
-                    lang = topic.get("lang") or item.get("language") or "unknown"
-                    tags = topic.get("tags") or []
+                    lang = topic.lang or item.get("language") or "unknown"
                     raw = {
                         "gdelt": {
                             "topic_key": topic_key,
                             "topics_found": [topic_key],
-                            "tags": tags,
+                            "tags": list(tags),
                             "raw_url": url,
                             "normalized_url": norm,
                             "raw_urls": [url],
@@ -752,25 +933,20 @@ def main() -> int:
                         "raw": raw,
                     }
 
-                    try:
-                        upsert_feed_item(sb, feed_item)
-                        topic_stats["inserted_new"] += 1
-                        stats["inserted_new"] += 1
-                        if DEBUG and accepted_sampled < 5:
-                            accepted_sampled += 1
-                            print(
-                                "GDELT_ACCEPT_SAMPLE "
-                                f"topic={topic_key} url={norm}"
-                            )
-                    except Exception as e:
-                        topic_stats["failed"] += 1
-                        stats["failed"] += 1
+                    pending_items.append((feed_item, topic_stats, topic_key))
+                    existing_ids.add(external_id)
+                    if DEBUG and accepted_sampled < 5:
+                        accepted_sampled += 1
                         print(
-                            f"GDELT_ITEM_FAIL topic={topic_key} err={type(e).__name__} msg={str(e)[:200]}"
+                            "GDELT_ACCEPT_SAMPLE "
+                            f"topic={topic_key} url={norm}"
                         )
+                    if len(pending_items) >= WRITE_BATCH:
+                        _flush_inserts()
                     if stats["items_processed"] >= max_total:
                         break
 
+                _flush_merges()
                 print(
                     "GDELT_TOPIC_SUMMARY "
                     f"topic={topic_key} "
@@ -795,22 +971,20 @@ def main() -> int:
                 if stats["items_processed"] >= max_total:
                     print("GDELT_RUN_STOP reason=budget_exhausted")
                     break
-                sleep_override = topic.get("sleep_override_sec")
-                if sleep_override is None:
-                    sleep_for = SLEEP_BASE + random.uniform(0, SLEEP_JITTER)
-                else:
-                    sleep_for = float(sleep_override)
-                time.sleep(sleep_for)
             except Exception as e:
                 error_msg = f"{type(e).__name__}: {str(e)[:200]}"
                 run_status = "fail"
                 print(f"GDELT_TOPIC_FAIL topic={topic_key} err={error_msg}")
                 break
+        # Every break above ends the run's fetching; don't let queued topics keep going.
+        _stop_fetching()
     except Exception as e:
         error_msg = f"{type(e).__name__}: {str(e)[:200]}"
         run_status = "fail"
         print(f"GDELT_RUN_FAIL err={error_msg}", file=sys.stderr)
     finally:
+        _stop_fetching()
+        _flush_merges()
         elapsed_ms = int((time.monotonic() - run_start) * 1000)
         print(
             "GDELT_RUN_SKIPS "
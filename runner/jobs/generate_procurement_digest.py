@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
 import os
+import random
 import time
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
 import psycopg2
 
+try:
+    import resend
+except ImportError:
+    resend = None
+
 
 STATE_PATH = Path("/var/lib/libyaintel/last_procurement_digest_at.txt")
 OUT_PATH = Path("/var/lib/libyaintel/procurement_digest.md")
+# Hash of the last digest body that was actually emailed; kept next to OUT_PATH,
+# which is written (and so known writable) before any email goes out.
+SENT_HASH_PATH = OUT_PATH.with_name(OUT_PATH.name + ".hash")
 
 
 def utcnow():
@@ -29,6 +39,28 @@ def save_last_run(ts: datetime):
     STATE_PATH.write_text(ts.isoformat(), encoding="utf-8")
 
 
+def body_hash(body: str) -> str:
+    return hashlib.blake2b(body.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def load_sent_hash() -> str:
+    try:
+        return SENT_HASH_PATH.read_text(encoding="utf-8").strip()
+    except Exception:
+        return ""
+
+
+def save_sent_hash(h: str):
+    # Runs after a successful send: a failure here must not skip save_last_run.
+    try:
+        SENT_HASH_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = SENT_HASH_PATH.with_name(SENT_HASH_PATH.name + ".tmp")
+        tmp.write_text(h, encoding="utf-8")
+        os.replace(tmp, SENT_HASH_PATH)
+    except OSError as e:
+        print(f"DIGEST_HASH_SAVE_FAILED path={SENT_HASH_PATH} err={type(e).__name__}")
+
+
 def md_escape(s: str) -> str:
     return (s or "").replace("\n", " ").strip()
 
@@ -38,56 +70,70 @@ def run(mode: str):
     now = utcnow()
     window_start = now - timedelta(days=7)
 
+    # Grouping, per-buyer counts and the 200-item cap happen in Postgres; only
+    # the rows that end up in the digest come back, already in buyer order.
     conn = psycopg2.connect(db_url)
-    cur = conn.cursor()
+    # Named (server-side) cursor: rows are streamed in batches of itersize.
+    cur = conn.cursor(name="digest_tenders")
+    cur.itersize = 1000
     cur.execute(
         """
-        SELECT
-          source,
-          buyer,
-          COALESCE(sector, 'unknown') AS sector,
-          COALESCE(title_en, title, '') AS title,
-          publish_date,
-          deadline_date,
-          COALESCE(attachments_count, 0) AS attachments_count,
-          url,
-          created_at
-        FROM tenders
-        WHERE created_at >= (now() at time zone 'utc') - interval '7 days'
-        ORDER BY buyer, created_at DESC
+        SELECT buyer_key, sector, n, title, publish_date, deadline_date,
+               attachments_count, url
+        FROM (
+          SELECT
+            COALESCE(NULLIF(buyer, ''), source) AS buyer_key,
+            first_value(COALESCE(sector, 'unknown')) OVER w AS sector,
+            count(*) OVER (PARTITION BY COALESCE(NULLIF(buyer, ''), source)) AS n,
+            row_number() OVER w AS rn,
+            COALESCE(title_en, title, '') AS title,
+            publish_date,
+            deadline_date,
+            COALESCE(attachments_count, 0) AS attachments_count,
+            url
+          FROM tenders
+          WHERE created_at >= (now() at time zone 'utc') - interval '7 days'
+          WINDOW w AS (
+            PARTITION BY COALESCE(NULLIF(buyer, ''), source) ORDER BY created_at DESC
+          )
+        ) t
+        WHERE rn <= 200
+        ORDER BY buyer_key, rn
         """
     )
-    rows = cur.fetchall()
-    conn.close()
-
     by_buyer = {}
-    for r in rows:
-        source, buyer, sector, title, pub, deadline, attc, url, created_at = r
-        key = buyer or source
-        by_buyer.setdefault(key, {"sector": sector, "items": []})
-        by_buyer[key]["items"].append(
-            {
-                "title": title,
-                "publish_date": pub,
-                "deadline_date": deadline,
-                "attachments_count": attc,
-                "url": url,
-                "created_at": created_at,
-            }
-        )
+    total = 0
+    try:
+        for key, sector, n, title, pub, deadline, attc, url in cur:
+            bucket = by_buyer.get(key)
+            if bucket is None:
+                bucket = by_buyer[key] = {"sector": sector, "count": n, "items": []}
+                total += n
+            bucket["items"].append(
+                {
+                    "title": title,
+                    "publish_date": pub,
+                    "deadline_date": deadline,
+                    "attachments_count": attc,
+                    "url": url,
+                }
+            )
+    finally:
+        cur.close()
+        conn.close()
 
     lines = []
     lines.append("# LibyaIntel Procurement Digest")
     lines.append("")
     lines.append(f"**Window:** {window_start.date().isoformat()} -> {now.date().isoformat()}")
-    lines.append(f"**Total new items:** {len(rows)}")
+    lines.append(f"**Total new items:** {total}")
     lines.append("")
 
     if by_buyer:
         lines.append("## Summary by buyer")
         for buyer in sorted(by_buyer.keys()):
             sector = by_buyer[buyer]["sector"]
-            count = len(by_buyer[buyer]["items"])
+            count = by_buyer[buyer]["count"]
             lines.append(f"- **{md_escape(buyer)}** ({md_escape(sector)}): {count}")
         lines.append("")
     else:
@@ -98,12 +144,12 @@ def run(mode: str):
         sector = by_buyer[buyer]["sector"]
         items = by_buyer[buyer]["items"]
         lines.append(f"## {md_escape(buyer)}")
-        lines.append(f"**Sector:** {md_escape(sector)}  |  **Count:** {len(items)}")
+        lines.append(f"**Sector:** {md_escape(sector)}  |  **Count:** {by_buyer[buyer]['count']}")
         lines.append("")
         lines.append("| Title | Published | Deadline | Attachments | Link |")
         lines.append("|---|---:|---:|---:|---|")
 
-        for it in items[:200]:
+        for it in items:
             title = md_escape(it["title"])[:160] or "(no title)"
             pub = it["publish_date"].isoformat() if it["publish_date"] else ""
             dl = it["deadline_date"].isoformat() if it["deadline_date"] else ""
@@ -115,6 +161,12 @@ def run(mode: str):
 
     OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
     body = "\n".join(lines)
+    digest_hash = body_hash(body)
+    if mode != "demo" and digest_hash == load_sent_hash():
+        # Same body as the last email (e.g. a rerun on the same day): no rewrite, no resend.
+        save_last_run(now)
+        print(f"DIGEST_UNCHANGED path={OUT_PATH} items={total} hash={digest_hash}")
+        return
     try:
         OUT_PATH.write_text(body, encoding="utf-8")
     except PermissionError as exc:
@@ -127,30 +179,29 @@ def run(mode: str):
     subject_prefix = os.getenv("DIGEST_SUBJECT_PREFIX", "[LibyaIntel] Procurement Digest").strip()
     subject = f"{subject_prefix} ({now.date().isoformat()})"
     if mode != "demo":
-        send_resend_email(body, subject)
+        if send_resend_email(body, subject):
+            save_sent_hash(digest_hash)
         save_last_run(now)
     print(
-        f"DIGEST_OK path={OUT_PATH} items={len(rows)} buyers={len(by_buyer)} "
+        f"DIGEST_OK path={OUT_PATH} items={total} buyers={len(by_buyer)} "
         f"window_start={window_start.isoformat()}"
     )
 
 
-def send_resend_email(markdown_body: str, subject: str):
+def send_resend_email(markdown_body: str, subject: str) -> bool:
     api_key = os.getenv("RESEND_API_KEY")
     if not api_key:
         print("DIGEST_EMAIL_SKIP missing RESEND_API_KEY")
-        return
+        return False
 
     to_raw = os.getenv("DIGEST_TO", "").strip()
     if not to_raw:
         print("DIGEST_EMAIL_SKIP missing DIGEST_TO")
-        return
+        return False
 
-    try:
-        import resend
-    except Exception as exc:
-        print(f"DIGEST_EMAIL_FAIL missing resend dependency err={exc}")
-        return
+    if resend is None:
+        print("DIGEST_EMAIL_FAIL missing resend dependency")
+        return False
 
     resend.api_key = api_key
 
@@ -158,6 +209,7 @@ def send_resend_email(markdown_body: str, subject: str):
     to_list = [x.strip() for x in to_raw.split(",") if x.strip()]
     max_retries = int(os.getenv("DIGEST_SEND_MAX_RETRIES", "5"))
     base_sleep = int(os.getenv("DIGEST_SEND_RETRY_BASE_SECONDS", "3"))
+    sleep_cap = int(os.getenv("DIGEST_SEND_RETRY_CAP", "60"))
 
     payload = {
         "from": from_addr,
@@ -171,14 +223,19 @@ def send_resend_email(markdown_body: str, subject: str):
             resp = resend.Emails.send(payload)
             msg_id = resp.get("id") if isinstance(resp, dict) else ""
             print(f"DIGEST_EMAIL_OK to={len(to_list)} attempt={attempt} id={msg_id}")
-            return
+            return True
         except Exception as exc:
             if attempt == max_retries:
                 print(f"DIGEST_EMAIL_FAIL to={len(to_list)} attempt={attempt} err={exc}")
-                return
-            sleep_s = base_sleep * attempt
-            print(f"DIGEST_EMAIL_RETRY to={len(to_list)} attempt={attempt} sleep={sleep_s}s err={exc}")
+                return False
+            # Full jitter over an exponential ceiling.
+            sleep_s = random.uniform(0, min(sleep_cap, base_sleep * 2 ** (attempt - 1)))
+            print(
+                f"DIGEST_EMAIL_RETRY to={len(to_list)} attempt={attempt} "
+                f"sleep={sleep_s:.1f}s err={exc}"
+            )
             time.sleep(sleep_s)
+    return False
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+
+db = pytest.importorskip("backend.db")
+
+# (stored, incoming, expected): stored duplicates survive, incoming ones are added once.
+CASES = [
+    ([], ["a", "b"], ["a", "b"]),
+    (["a", "b"], ["b", "c"], ["a", "b", "c"]),
+    (["a", "a", "b"], ["b", "c", "c"], ["a", "a", "b", "c"]),
+    (["b", "a"], ["c", "a", "d"], ["b", "a", "c", "d"]),
+    (None, ["a"], ["a"]),
+    ("not-a-list", ["a"], ["a"]),
+    (["a"], None, ["a"]),
+    (["a"], "not-a-list", ["a"]),
+]
+
+
+def _py_union(stored, incoming):
+    raw = {"gdelt": {"tags": stored}}
+    return db._merge_gdelt_raw(raw, {"tags": incoming})["gdelt"]["tags"]
+
+
+@pytest.mark.parametrize("stored,incoming,expected", CASES)
+def test_merge_gdelt_raw(stored, incoming, expected):
+    assert _py_union(stored, incoming) == expected
+
+
+@pytest.mark.parametrize("stored,incoming,expected", CASES)
+def test_jsonb_array_union_matches_python(stored, incoming, expected):
+    # Needs a database with migrations/20260207_merge_gdelt_topics_rpc.sql applied.
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        pytest.skip("DATABASE_URL not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(db_url)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT public.jsonb_array_union(%s::jsonb, %s::jsonb)",
+                (json.dumps(stored), json.dumps(incoming)),
+            )
+            got = cur.fetchone()[0]
+    finally:
+        conn.close()
+    assert got == _py_union(stored, incoming) == expected